@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Compare Whisper cold-start time and per-process memory: whisper.load_model()
+versus memory-mapped weights (weights.py).
+
+Each mode starts --processes fresh processes at once. Each process loads the
+model and reads every weight once. Memory is measured once all of them hold
+the model, so the numbers show how much the processes share. RSS counts shared page-cache pages in every
+process. PSS splits them between the processes, and USS is memory private
+to one process.
+
+Usage:
+    python bench_whisper_load.py --model base --processes 4 --device cpu
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import time
+
+import psutil
+
+MB = 1024 * 1024
+
+
+def _load(mode: str, model: str, device: str, directory: str, barrier, results):
+    # Imports are not part of the measured load time; both modes pay them equally
+    import whisper
+    from weights import load_whisper_model
+
+    start = time.perf_counter()
+    if mode == "mmap":
+        loaded = load_whisper_model(model, device, directory)
+    else:
+        loaded = whisper.load_model(model, device=device, download_root=directory)
+    load_time = time.perf_counter() - start
+    # Read every weight once, as the first transcription would, so mapped pages are resident too
+    sum(float(parameter.sum()) for parameter in loaded.parameters())
+
+    barrier.wait()  # Everyone holds a model now
+    memory = psutil.Process().memory_full_info()
+    results.put({"load_time": load_time, "rss": memory.rss, "pss": memory.pss, "uss": memory.uss})
+    barrier.wait()  # Stay alive until every process has measured
+    del loaded
+
+
+def run(mode: str, model: str, device: str, directory: str, processes: int):
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(processes)
+    results = context.Queue()
+    workers = [context.Process(target=_load, args=(mode, model, device, directory, barrier, results))
+               for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    samples = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Whisper load time and memory, unpickled vs memory-mapped")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--weights-dir", default=None, help="defaults to $WHISPER_WEIGHTS_DIR or ~/.cache/whisper, as in main.py")
+    args = parser.parse_args()
+
+    from weights import convert_checkpoint, mmap_supported
+
+    if not mmap_supported():
+        raise SystemExit("Memory-mapped loading needs torch >= 2.1")
+    directory = args.weights_dir or os.getenv(
+        "WHISPER_WEIGHTS_DIR", os.path.join(os.path.expanduser("~"), ".cache", "whisper"))
+
+    # Download and convert up front so neither mode is charged for it
+    convert_checkpoint(args.model, directory)
+
+    print(f"Whisper {args.model} on {args.device}, {args.processes} processes loading at once (warm page cache)")
+    print(f"{'mode':<12} {'load s':>8} {'RSS MB':>8} {'PSS MB':>8} {'USS MB':>8}  (mean per process)")
+    for mode in ("load_model", "mmap"):
+        samples = run(mode, args.model, args.device, directory, args.processes)
+        mean = {key: statistics.mean(sample[key] for sample in samples) for key in samples[0]}
+        print(f"{mode:<12} {mean['load_time']:>8.2f} {mean['rss'] / MB:>8.0f} "
+              f"{mean['pss'] / MB:>8.0f} {mean['uss'] / MB:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
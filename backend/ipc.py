@@ -0,0 +1,387 @@
+"""
+Local IPC between the HTTP front-end workers and the model server.
+
+Messages are length-prefixed JSON frames over a Unix domain socket. Large
+``bytes`` values (audio, images) are not written to the socket: they are
+placed in a POSIX shared memory segment and only the segment name travels in
+the frame. The requesting side always unlinks the segments, both the ones it
+created for the request and the ones the server created for the reply.
+
+Only the creator of a segment registers it with the multiprocessing resource
+tracker, so a crashed process's segments are still cleaned up. The peer
+attaches without registering: spawned processes share one tracker, and a
+second registration or unregistration would cancel out the creator's.
+Reply segments change hands, so the server drops its registration as it
+sends the reply and the requester unlinks them without one.
+
+Methods that are async generators stream: each yielded item is sent as its
+own ``chunk`` frame, followed by a final reply frame. A client that stops
+waiting sends a ``cancel`` frame, which cancels the call on the server.
+"""
+
+import asyncio
+import base64
+import inspect
+import itertools
+import json
+import logging
+import os
+import struct
+import threading
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct("!I")
+SHM_THRESHOLD = 64 * 1024  # Payloads at least this large go through shared memory
+SHM_DIR = "/dev/shm"
+
+
+class ModelServerError(Exception):
+    """Raised on the client when the model server reports a failure"""
+
+
+class SharedBlob:
+    """Read-only handle on a shared memory segment received from the peer"""
+
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = size
+        self._shm = attach(name)
+
+    @property
+    def path(self) -> Optional[str]:
+        """Filesystem path of the segment, so tools like ffmpeg can read it in place"""
+        path = os.path.join(SHM_DIR, self.name)
+        return path if os.path.exists(path) else None
+
+    def tobytes(self) -> bytes:
+        with self._shm.buf[:self.size] as view:
+            return bytes(view)
+
+    def close(self):
+        self._shm.close()
+
+
+# Python 3.13 added SharedMemory(track=False); before that, opening a segment always registered it
+_TRACK_PARAMETER = "track" in inspect.signature(shared_memory.SharedMemory).parameters
+_attach_lock = threading.Lock()
+
+
+def attach(name: str) -> shared_memory.SharedMemory:
+    """Open a segment created by the peer without registering it with the resource tracker"""
+    if _TRACK_PARAMETER:
+        return shared_memory.SharedMemory(name=name, track=False)
+    with _attach_lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def _unlink_untracked(shm: shared_memory.SharedMemory):
+    """Unlink a segment this process does not have registered, leaving the resource tracker alone"""
+    if _TRACK_PARAMETER:
+        shm.unlink()
+    else:
+        shared_memory._posixshmem.shm_unlink(shm._name)
+
+
+def _hand_over(shm: shared_memory.SharedMemory):
+    # The peer unlinks this segment from now on; drop the creator's registration
+    # so this process's resource tracker does not unlink it (and warn) at exit
+    resource_tracker.unregister(shm._name, "shared_memory")
+
+
+def encode(obj: Any, segments: List[shared_memory.SharedMemory]) -> Any:
+    """Make ``obj`` JSON-safe, moving large bytes values into shared memory"""
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        data = memoryview(obj).cast("B")
+        if data.nbytes >= SHM_THRESHOLD:
+            shm = shared_memory.SharedMemory(create=True, size=data.nbytes)
+            shm.buf[:data.nbytes] = data
+            segments.append(shm)
+            return {"__shm__": shm.name, "size": data.nbytes}
+        return {"__b64__": base64.b64encode(data).decode()}
+    if isinstance(obj, dict):
+        return {key: encode(value, segments) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [encode(value, segments) for value in obj]
+    return obj
+
+
+def decode(obj: Any, blobs: Optional[List[SharedBlob]] = None) -> Any:
+    """
+    Reverse of ``encode``. With ``blobs`` given, shared memory values become
+    ``SharedBlob`` handles (collected so the caller can close them); without
+    it they are copied into ``bytes`` and the segment is unlinked.
+    """
+    if isinstance(obj, dict):
+        if "__b64__" in obj:
+            return base64.b64decode(obj["__b64__"])
+        if "__shm__" in obj:
+            if blobs is not None:
+                blob = SharedBlob(obj["__shm__"], obj["size"])
+                blobs.append(blob)
+                return blob
+            shm = attach(obj["__shm__"])
+            try:
+                with shm.buf[:obj["size"]] as view:
+                    return bytes(view)
+            finally:
+                shm.close()
+                _unlink_untracked(shm)
+        return {key: decode(value, blobs) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [decode(value, blobs) for value in obj]
+    return obj
+
+
+def _release(segments: Iterable[shared_memory.SharedMemory]):
+    """Close and unlink segments this process created and still owns"""
+    for shm in segments:
+        try:
+            shm.close()
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Dict[str, Any]:
+    header = await reader.readexactly(HEADER.size)
+    (length,) = HEADER.unpack(header)
+    return json.loads(await reader.readexactly(length))
+
+
+def write_frame(writer: asyncio.StreamWriter, message: Dict[str, Any]):
+    payload = json.dumps(message, default=str).encode()
+    writer.write(HEADER.pack(len(payload)) + payload)
+
+
+class RPCServer:
+    """Serves the async methods named in ``methods`` of ``target`` over a Unix socket"""
+
+    def __init__(self, target: Any, path: str, methods: Iterable[str]):
+        self.target = target
+        self.path = path
+        self.methods = set(methods)
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._handle_connection, path=self.path)
+        os.chmod(self.path, 0o600)
+        logger.info(f"Model server listening on {self.path}")
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        write_lock = asyncio.Lock()
+        running: Dict[int, asyncio.Task] = {}
+        try:
+            while True:
+                message = await read_frame(reader)
+                if message.get("cancel"):
+                    task = running.get(message["id"])
+                    if task is not None:
+                        task.cancel()
+                    continue
+                task = asyncio.create_task(self._dispatch(message, writer, write_lock))
+                running[message["id"]] = task
+                task.add_done_callback(lambda _, request_id=message["id"]: running.pop(request_id, None))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for task in list(running.values()):
+                task.cancel()
+            writer.close()
+
+    async def _dispatch(self, message: Dict[str, Any], writer: asyncio.StreamWriter, write_lock: asyncio.Lock):
+        request_id = message["id"]
+        op = message["op"]
+        blobs: List[SharedBlob] = []
+        segments: List[shared_memory.SharedMemory] = []
+        try:
+            if op not in self.methods:
+                raise ValueError(f"Unknown model server operation: {op}")
+            args = decode(message.get("args", {}), blobs)
+            result = getattr(self.target, op)(**args)
+            if inspect.isasyncgen(result):
+                async for item in result:
+                    await self._send(writer, write_lock, {"id": request_id, "ok": True}, "chunk", item)
+                result = None
+            else:
+                result = await result
+            reply = {"id": request_id, "ok": True, "result": encode(result, segments)}
+        except asyncio.TimeoutError:
+            reply = {"id": request_id, "ok": False, "timeout": True, "error": f"{op} timed out"}
+        except ValueError as e:
+            # Bad arguments, e.g. from an admin request: the caller turns these into a 400
+            reply = {"id": request_id, "ok": False, "invalid": True, "error": str(e)}
+        except Exception as e:
+            logger.error(f"Model server {op} error: {e}")
+            reply = {"id": request_id, "ok": False, "error": str(e)}
+        finally:
+            for blob in blobs:
+                blob.close()
+
+        await self._write(writer, write_lock, reply, segments)
+
+    async def _send(self, writer: asyncio.StreamWriter, write_lock: asyncio.Lock,
+                    message: Dict[str, Any], key: str, value: Any):
+        segments: List[shared_memory.SharedMemory] = []
+        await self._write(writer, write_lock, {**message, key: encode(value, segments)}, segments)
+
+    async def _write(self, writer: asyncio.StreamWriter, write_lock: asyncio.Lock,
+                     message: Dict[str, Any], segments: List[shared_memory.SharedMemory]):
+        # Hand over before the requester can see (and unlink) the segments
+        for shm in segments:
+            _hand_over(shm)
+        try:
+            async with write_lock:
+                write_frame(writer, message)
+                await writer.drain()
+        except BaseException:
+            # Nobody will read the reply, so nobody will unlink its segments
+            for shm in segments:
+                try:
+                    _unlink_untracked(shm)
+                except FileNotFoundError:
+                    pass
+            raise
+        finally:
+            for shm in segments:
+                shm.close()
+
+
+class RPCClient:
+    """Multiplexes concurrent calls from one process over a single connection"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._streams: Dict[int, asyncio.Queue] = {}
+        self._ids = itertools.count()
+        self._lock = asyncio.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.open_unix_connection(self.path)
+        self._reader_task = asyncio.create_task(self._read_replies())
+
+    async def close(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+        self._writer = None
+
+    async def _read_replies(self):
+        try:
+            while True:
+                message = await read_frame(self._reader)
+                stream = self._streams.get(message["id"])
+                if stream is not None:
+                    stream.put_nowait(message)
+                    continue
+                future = self._pending.pop(message["id"], None)
+                if future is None or future.done():
+                    # The caller gave up; still unlink any reply segments
+                    decode(message.get("result", message.get("chunk")))
+                    continue
+                future.set_result(message)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            logger.error("Lost connection to model server")
+        finally:
+            self._writer = None
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ModelServerError("Model server connection lost"))
+            self._pending.clear()
+            for request_id, stream in self._streams.items():
+                stream.put_nowait({"id": request_id, "ok": False, "error": "Model server connection lost"})
+
+    async def _send_request(self, request_id: int, op: str, kwargs: Dict[str, Any],
+                            segments: List[shared_memory.SharedMemory]):
+        frame = {"id": request_id, "op": op, "args": encode(kwargs, segments)}
+        async with self._lock:
+            if not self.connected:
+                await self.connect()
+            write_frame(self._writer, frame)
+            await self._writer.drain()
+
+    def _cancel_remote(self, request_id: int):
+        """Tell the server to stop work nobody is waiting for (best effort, never blocks)"""
+        if self.connected:
+            write_frame(self._writer, {"id": request_id, "cancel": True})
+
+    async def call(self, op: str, **kwargs) -> Any:
+        segments: List[shared_memory.SharedMemory] = []
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            await self._send_request(request_id, op, kwargs, segments)
+            message = await future
+        except asyncio.CancelledError:
+            self._cancel_remote(request_id)
+            raise
+        finally:
+            self._pending.pop(request_id, None)
+            _release(segments)
+
+        return _result(message)
+
+    async def stream(self, op: str, **kwargs) -> AsyncIterator[Any]:
+        """Call a streaming (async generator) method, yielding its items as they arrive"""
+        segments: List[shared_memory.SharedMemory] = []
+        request_id = next(self._ids)
+        replies: asyncio.Queue = asyncio.Queue()
+        self._streams[request_id] = replies
+        finished = False
+        try:
+            await self._send_request(request_id, op, kwargs, segments)
+            while True:
+                message = await replies.get()
+                if "chunk" not in message:
+                    finished = True
+                    _result(message)
+                    return
+                yield decode(message["chunk"])
+        finally:
+            if not finished:
+                self._cancel_remote(request_id)
+            self._streams.pop(request_id, None)
+            _release(segments)
+            # Unlink segments of chunks that arrived after the caller stopped reading
+            while not replies.empty():
+                message = replies.get_nowait()
+                decode(message.get("chunk", message.get("result")))
+
+
+def _result(message: Dict[str, Any]) -> Any:
+    if message["ok"]:
+        return decode(message["result"])
+    if message.get("timeout"):
+        raise asyncio.TimeoutError(message["error"])
+    if message.get("invalid"):
+        raise ValueError(message["error"])
+    raise ModelServerError(message["error"])
@@ -0,0 +1,31 @@
+"""
+Helpers shared by the tests that talk to a real RPCServer over a Unix socket
+"""
+
+import os
+import tempfile
+
+from ipc import RPCClient, RPCServer
+
+
+def socket_path() -> str:
+    return os.path.join(tempfile.mkdtemp(), "model.sock")
+
+
+def shm_segments():
+    """POSIX shared memory segments currently on the system"""
+    return {name for name in os.listdir("/dev/shm") if name.startswith("psm_")}
+
+
+async def with_server(service, methods, scenario):
+    """Serve ``methods`` of ``service`` on a fresh socket and return ``await scenario(client)``"""
+    path = socket_path()
+    server = RPCServer(service, path, set(methods))
+    await server.start()
+    client = RPCClient(path)
+    await client.connect()
+    try:
+        return await scenario(client)
+    finally:
+        await client.close()
+        await server.close()
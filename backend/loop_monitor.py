@@ -0,0 +1,126 @@
+"""
+Event-loop lag monitor and blocking-call detector.
+
+A probe task sleeps for a fixed interval and records how late it wakes up;
+that delay is the time the loop spent on other callbacks. A watchdog thread
+notices when the probe stops ticking and captures the loop thread's stack
+while the offending call is still running.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STACK_DEPTH = 6  # Innermost frames kept per offender
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = 0.05, block_threshold: float = 0.1,
+                 history: int = 2000, max_offenders: int = 50):
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self.max_offenders = max_offenders
+        self.samples = deque(maxlen=history)
+        self.blocked_count = 0
+        self.offenders: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+        self.running = False
+        self._heartbeat = time.perf_counter()
+        self._loop_thread_id: Optional[int] = None
+        self._captured_stack: Optional[Tuple[str, ...]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start probing the running event loop"""
+        if self.running:
+            return
+        self.running = True
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.perf_counter()
+        self._task = asyncio.create_task(self._probe())
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+
+    def stop(self):
+        self.running = False
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _probe(self):
+        while self.running:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            lag = max(0.0, now - expected)
+            with self.lock:
+                self._heartbeat = now
+                self.samples.append(lag)
+                stack, self._captured_stack = self._captured_stack, None
+                if lag >= self.block_threshold:
+                    self.blocked_count += 1
+                    if stack is not None:
+                        self._record(stack, lag)
+
+    def _watch(self):
+        """Watchdog thread: grab the loop's stack while it is blocked"""
+        while self.running:
+            time.sleep(self.block_threshold / 2)
+            with self.lock:
+                stalled = time.perf_counter() - self._heartbeat - self.interval
+                if stalled < self.block_threshold or self._captured_stack is not None:
+                    continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = tuple(
+                f"{entry.filename}:{entry.lineno} in {entry.name}"
+                for entry in traceback.extract_stack(frame)[-STACK_DEPTH:]
+            )
+            with self.lock:
+                self._captured_stack = stack
+
+    def _record(self, stack: Tuple[str, ...], lag: float):
+        offender = self.offenders.get(stack)
+        if offender is None:
+            if len(self.offenders) >= self.max_offenders:
+                # Make room by dropping the offender with the least blocked time
+                smallest = min(self.offenders, key=lambda key: self.offenders[key]["total_seconds"])
+                del self.offenders[smallest]
+            offender = self.offenders[stack] = {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+            logger.warning(f"Event loop blocked for {lag:.3f}s at {stack[-1]}")
+        offender["count"] += 1
+        offender["total_seconds"] += lag
+        offender["max_seconds"] = max(offender["max_seconds"], lag)
+
+    def stats(self, top: int = 10) -> Dict[str, Any]:
+        """Lag percentiles (in milliseconds) and the callbacks that blocked longest in total"""
+        with self.lock:
+            samples = sorted(self.samples)
+            offenders = sorted(self.offenders.items(), key=lambda item: item[1]["total_seconds"], reverse=True)
+
+        def percentile(p: float) -> float:
+            if not samples:
+                return 0.0
+            return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+
+        top_offenders: List[Dict[str, Any]] = [
+            {"stack": list(stack), **values} for stack, values in offenders[:top]
+        ]
+        return {
+            "samples": len(samples),
+            "lag_ms": {
+                "p50": percentile(0.50),
+                "p90": percentile(0.90),
+                "p99": percentile(0.99),
+                "max": samples[-1] * 1000 if samples else 0.0,
+            },
+            "block_threshold_ms": self.block_threshold * 1000,
+            "blocked_count": self.blocked_count,
+            "top_offenders": top_offenders,
+        }
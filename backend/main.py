@@ -1,19 +1,17 @@
 import asyncio
 import os
 import logging
-from contextlib import asynccontextmanager
-from typing import List, Optional, Dict, Any
+import functools
+from contextlib import aclosing, asynccontextmanager, closing
+from typing import List, Optional, Dict, Any, Tuple, AsyncIterator
 import uvicorn
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, BackgroundTasks
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, BackgroundTasks, Depends, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse, Response
-from pydantic import BaseModel
-import torch
-import whisper
-import ollama
-from gtts import gTTS
+from pydantic import BaseModel, Field
 import io
 import base64
+import json
 import tempfile
 import aiofiles
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -21,6 +19,7 @@ import threading
 import queue
 import time
 from datetime import datetime
+from collections import OrderedDict, deque
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
 from reportlab.pdfgen import canvas
@@ -29,10 +28,25 @@ from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image
 from reportlab.lib.enums import TA_CENTER
 import gc
+import math
+import secrets
+import signal
 import psutil
 import asyncio
 from asyncio import Semaphore
 import httpx
+from ipc import RPCClient, RPCServer, SharedBlob
+from scheduling import AdaptiveLimit, CancellationStats, PrioritySemaphore
+from loop_monitor import LoopLagMonitor
+from rate_limiter import RateLimiter
+from ollama_pool import OllamaHostError, OllamaPool
+from media import collect_distinct_images, iter_video_frames
+from sentences import SentenceSplitter
+from stats_sampler import SystemStatsSampler
+from supervisor import ProcessSupervisor
+from traffic_capture import TrafficCapture
+# torch, whisper, gTTS and weights are imported only where the model server uses them,
+# so the HTTP workers (several per node) do not each load the model runtimes
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -44,6 +58,7 @@ executor = None
 whisper_workers = []
 tts_workers = []
 ollama_semaphore = None
+ollama_pool = None
 whisper_semaphore = None
 tts_semaphore = None
 
@@ -53,6 +68,7 @@ request_stats = {
     "vlm_requests": 0,
     "whisper_requests": 0,
     "tts_requests": 0,
+    "voice_requests": 0,
     "active_requests": 0,
     "failed_requests": 0
 }
@@ -67,11 +83,69 @@ CONFIG = {
     "whisper_workers": 8,  # Multiple Whisper workers
     "tts_workers": 8,  # Multiple TTS workers
     "ollama_max_concurrent": 10,  # Max concurrent Ollama requests
+    "ollama_bulk_max_concurrent": 6,  # Slots batch jobs may hold, the rest stay free for interactive chat
+    "llm_batch_max_prompts": 100,  # Max prompts per /api/llm/batch request
+    "llm_batch_parallel": 4,  # Prompts of one batch running at once
     "whisper_max_concurrent": 8,  # Max concurrent Whisper requests
     "tts_max_concurrent": 8,  # Max concurrent TTS requests
+    "adaptive_concurrency": True,  # Tune the limits above from observed latency (AIMD)
+    "ollama_concurrency_bounds": (2, 24),  # (min, max) for the adaptive GPU 0 limit
+    "whisper_concurrency_bounds": (1, 16),  # (min, max) for the adaptive GPU 1 limit
+    "ollama_latency_tolerance": 3.0,  # Back off when a call is this many times slower than the fastest recent one
+    "whisper_latency_tolerance": 2.0,
+    "ollama_hosts": os.getenv("OLLAMA_HOSTS", os.getenv("OLLAMA_HOST", "http://localhost:11434")).split(","),
+    "ollama_health_interval": 10,  # Seconds between /api/tags + /api/ps polls of each host
+    "ollama_hedge_chat": True,  # Re-send slow text chats to a second host, first answer wins
+    "ollama_hedge_multiplier": 2.0,  # Hedge once a host takes this many times its usual latency
+    "ollama_hedge_min_delay": 0.5,  # ...but never sooner than this (seconds)
+    "vlm_batch_max_images": 16,  # Images, or distinct video frames, analyzed per /api/vlm/batch request
+    "vlm_video_max_frames": 600,  # Video frames sampled (before dedup) per request; bounds decode time
+    "vlm_dedup_distance": 6,  # Max dHash bit difference for two images to count as the same
+    "whisper_model": os.getenv("WHISPER_MODEL", "base"),
+    "whisper_mmap_weights": os.getenv("WHISPER_MMAP_WEIGHTS", "1") == "1",  # Map converted weights instead of unpickling them
+    "whisper_weights_dir": os.getenv("WHISPER_WEIGHTS_DIR", os.path.join(os.path.expanduser("~"), ".cache", "whisper")),
+    "whisper_default_profile": "fast",  # Decode profile when /api/whisper gets none, see WHISPER_PROFILES
     "request_timeout": 15,  # Reduced timeout
+    "disconnect_poll_interval": 0.5,  # Seconds between checks for clients that gave up waiting
     "queue_maxsize": 500,  # Larger queues
     "gpu_memory_fraction": 0.8,  # GPU memory management
+    "api_workers": int(os.getenv("API_WORKERS", "1")),  # HTTP worker processes; >1 starts a separate model server
+    "model_server_socket": os.getenv("MODEL_SERVER_SOCKET", "/tmp/ai-demo-model-server.sock"),
+    "model_server_connect_timeout": 300,  # Front-ends wait this long for the model server to load models
+    "model_server_max_restarts": 3,  # Restarts of a crashed model server allowed per window before the whole backend exits
+    "model_server_restart_window": 600,  # Seconds
+    "stats_interval": 1.0,  # Seconds between system-stats samples
+    "capture_dir": os.getenv("CAPTURE_DIR", ""),  # Record request shapes here for replay.py; unset disables capture
+    "capture_payload_rate": float(os.getenv("CAPTURE_PAYLOAD_RATE", "0")),  # Fraction of captured requests that keep the full body
+    "loop_monitor_interval": 0.05,  # Event-loop lag probe period (seconds)
+    "loop_block_threshold": 0.1,  # Record the stack of callbacks blocking the loop longer than this
+    "rate_limit_capacity": 20,  # Token-bucket burst size per session
+    "rate_limit_refill_per_second": 0.5,  # Tokens regained per second per session
+    "rate_limit_costs": {  # Tokens spent per request (per prompt for llm_batch)
+        "llm": 1,
+        "llm_batch": 1,
+        "vlm": 4,
+        "whisper": 3,
+        "tts": 1,
+        "voice": 5,
+    },
+}
+
+# Required in X-Admin-Token for /api/admin/*; unset disables them. Not part of
+# CONFIG, which /health and /api/performance return to anyone.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Whisper decode profiles, passed to whisper_model.transcribe()
+WHISPER_PROFILES = {
+    # Whisper defaults: language detection and temperature-fallback re-decoding
+    "accurate": {},
+    # Single greedy pass, no fallback, no timestamps; fp16 is dropped on CPU
+    "fast": {
+        "temperature": 0.0,
+        "condition_on_previous_text": False,
+        "without_timestamps": True,
+        "fp16": True,
+    },
 }
 
 class PerformanceMonitor:
@@ -97,52 +171,177 @@ class PerformanceMonitor:
             if len(self.request_times) > 100:
                 self.request_times = self.request_times[-100:]
     
-    def get_stats(self):
+    def snapshot(self) -> Dict[str, Any]:
+        """This process's counters, reported to the ModelService to be summed over all API workers"""
         with self.lock:
-            avg_time = sum(self.request_times) / len(self.request_times) if self.request_times else 0
-            return {
-                "active_requests": self.active_requests,
-                "average_response_time": avg_time,
-                "total_requests": len(self.request_times),
-                "memory_usage": psutil.virtual_memory().percent,
-                "gpu_memory": self._get_gpu_memory()
-            }
-    
-    def _get_gpu_memory(self):
-        try:
-            if torch.cuda.is_available():
-                return {
-                    f"gpu_{i}": {
-                        "allocated": torch.cuda.memory_allocated(i) / 1024**3,
-                        "cached": torch.cuda.memory_reserved(i) / 1024**3
-                    }
-                    for i in range(torch.cuda.device_count())
-                }
-        except:
-            pass
-        return {}
+            return {"request_stats": dict(request_stats), "request_times": list(self.request_times)}
+
+def performance_stats(totals: Dict[str, Any], system: Dict[str, Any]) -> Dict[str, Any]:
+    """Request stats from ModelService.request_totals plus memory figures from a sampler snapshot"""
+    request_times = totals["request_times"]
+    avg_time = sum(request_times) / len(request_times) if request_times else 0
+    return {
+        "active_requests": totals["request_stats"]["active_requests"],
+        "average_response_time": avg_time,
+        "total_requests": len(request_times),
+        "memory_usage": system.get("memory_percent"),
+        "gpu_memory": gpu_memory_summary(system)
+    }
+
+def collect_system_stats() -> Dict[str, float]:
+    """One sample for the stats sampler; called once per CONFIG["stats_interval"]"""
+    stats = {
+        # Since the previous call, i.e. averaged over one sampling interval
+        "cpu_percent": psutil.cpu_percent(interval=None),
+        "memory_percent": psutil.virtual_memory().percent,
+        "disk_percent": psutil.disk_usage('/').percent,
+    }
+    try:
+        import torch
+        if torch.cuda.is_available():
+            for i in range(torch.cuda.device_count()):
+                stats[f"gpu_{i}_allocated_gb"] = torch.cuda.memory_allocated(i) / 1024**3
+                stats[f"gpu_{i}_cached_gb"] = torch.cuda.memory_reserved(i) / 1024**3
+    except Exception:
+        pass
+    stats["whisper_queue"] = sum(w.queue.qsize() for w in whisper_worker_pool)
+    stats["tts_queue"] = sum(w.queue.qsize() for w in tts_worker_pool)
+    for name, limit in gpu_manager.limits.items():
+        stats[f"{name}_in_use"] = limit.semaphore.in_use
+        stats[f"{name}_waiting"] = limit.semaphore.waiting
+        stats[f"{name}_limit"] = int(limit.limit)
+    return stats
+
+def gpu_memory_summary(system: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """Per-GPU memory (GB) in the shape /health has always returned"""
+    summary = {}
+    for key, value in system.items():
+        if key.startswith("gpu_") and key.endswith("_allocated_gb"):
+            gpu = key[:-len("_allocated_gb")]
+            summary[gpu] = {"allocated": value, "cached": system.get(f"{gpu}_cached_gb")}
+    return summary
 
 monitor = PerformanceMonitor()
+loop_monitor = LoopLagMonitor(
+    interval=CONFIG["loop_monitor_interval"],
+    block_threshold=CONFIG["loop_block_threshold"]
+)
+
+def signals_overload(error: BaseException) -> bool:
+    """Whether a failed GPU call says the device or its server is struggling.
+
+    Only transport errors and 5xx answers do; a corrupt upload or a 4xx for
+    a bad image is the client's fault and must not shrink the limit for
+    everyone. (Timeouts are handled by the caller.)
+    """
+    if isinstance(error, httpx.TransportError) or isinstance(error.__cause__, httpx.TransportError):
+        return True
+    return isinstance(error, OllamaHostError) and error.status_code is not None and error.status_code >= 500
 
 class OptimizedGPUManager:
     def __init__(self):
-        self.gpu_0_semaphore = Semaphore(CONFIG["ollama_max_concurrent"])
-        self.gpu_1_semaphore = Semaphore(max(CONFIG["whisper_max_concurrent"], CONFIG["tts_max_concurrent"]))
-        
-    async def acquire_gpu_0(self):
-        await self.gpu_0_semaphore.acquire()
-        
-    def release_gpu_0(self):
-        self.gpu_0_semaphore.release()
-        
-    async def acquire_gpu_1(self):
-        await self.gpu_1_semaphore.acquire()
+        self.gpu_0_semaphore = PrioritySemaphore(
+            CONFIG["ollama_max_concurrent"],
+            class_limits={"bulk": CONFIG["ollama_bulk_max_concurrent"]}
+        )
+        self.gpu_1_semaphore = PrioritySemaphore(max(CONFIG["whisper_max_concurrent"], CONFIG["tts_max_concurrent"]))
         
-    def release_gpu_1(self):
-        self.gpu_1_semaphore.release()
+        # Limits start from CONFIG and are then tuned from observed latency
+        self.limits = {
+            "gpu_0": AdaptiveLimit(
+                self.gpu_0_semaphore,
+                *CONFIG["ollama_concurrency_bounds"],
+                tolerance=CONFIG["ollama_latency_tolerance"],
+                enabled=CONFIG["adaptive_concurrency"]
+            ),
+            "gpu_1": AdaptiveLimit(
+                self.gpu_1_semaphore,
+                *CONFIG["whisper_concurrency_bounds"],
+                tolerance=CONFIG["whisper_latency_tolerance"],
+                enabled=CONFIG["adaptive_concurrency"]
+            ),
+        }
+        # TTS (gTTS) runs off the GPU, so its drops are counted but not as GPU time
+        self.cancellations = CancellationStats(gpu_kinds=("llm", "vlm", "vlm_batch", "whisper"))
+    
+    @asynccontextmanager
+    async def _slot(self, name: str, priority: str, sample: bool = True, kind: Optional[str] = None,
+                    deadline: Optional[float] = None):
+        """Hold a GPU slot and feed the call's latency and outcome to the adaptive limit.
+
+        With ``deadline`` (event loop time) set, waiting for the slot past it
+        raises asyncio.TimeoutError, so queued work whose caller has given up
+        never reaches the GPU.
+
+        With ``kind`` set, the work is also counted in the cancellation stats:
+        cancelled or timed out while waiting for the slot, cancelled or timed
+        out while holding it, or completed.
+        """
+        limit = self.limits[name]
+        semaphore = limit.semaphore
+        try:
+            if deadline is None:
+                await semaphore.acquire(priority)
+            else:
+                await asyncio.wait_for(semaphore.acquire(priority), deadline - asyncio.get_running_loop().time())
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            if kind:
+                self.cancellations.dropped(kind)
+            raise
+        start_time = time.monotonic()
+        in_flight = semaphore.in_use
+        saturated = in_flight >= semaphore.limit or semaphore.waiting > 0
+        success = None
+        abandoned = False
+        try:
+            yield
+            success = True
+        except asyncio.CancelledError:
+            # Says nothing about GPU load, so no sample
+            abandoned = True
+            raise
+        except asyncio.TimeoutError:
+            success = False
+            abandoned = True
+            raise
+        except Exception as e:
+            # Bad input says nothing about GPU load either
+            if signals_overload(e):
+                success = False
+            raise
+        finally:
+            # Released before the caller sees the cancellation, so the next waiter starts now
+            saturated = saturated or semaphore.in_use >= semaphore.limit or semaphore.waiting > 0
+            semaphore.release(priority)
+            elapsed = time.monotonic() - start_time
+            if success is not None and sample:
+                limit.observe(elapsed, success, saturated, in_flight, kind)
+            if kind and abandoned:
+                self.cancellations.aborted(kind, elapsed)
+            elif kind and success:
+                self.cancellations.completed(kind, elapsed)
+    
+    def gpu_0(self, priority: str = "interactive", sample: bool = True, kind: Optional[str] = None,
+              deadline: Optional[float] = None):
+        """Slot for Ollama (LLM/VLM) work; multi-call jobs pass sample=False to keep latency stats per call"""
+        return self._slot("gpu_0", priority, sample, kind, deadline)
+    
+    def gpu_1(self, kind: Optional[str] = None, deadline: Optional[float] = None):
+        """Slot for Whisper work"""
+        return self._slot("gpu_1", "interactive", kind=kind, deadline=deadline)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {name: limit.stats() for name, limit in self.limits.items()}
 
 gpu_manager = OptimizedGPUManager()
 
+# Lives with the models so that all API workers share one set of buckets
+rate_limiter = RateLimiter(
+    capacity=CONFIG["rate_limit_capacity"],
+    refill_rate=CONFIG["rate_limit_refill_per_second"],
+    costs=CONFIG["rate_limit_costs"]
+)
+
 # Request/Response Models
 class LLMRequest(BaseModel):
     message: str
@@ -152,6 +351,11 @@ class LLMResponse(BaseModel):
     response: str
     timestamp: datetime
 
+class LLMBatchRequest(BaseModel):
+    prompts: List[str]
+    user_name: str = "User"
+    parallel: Optional[int] = None
+
 class VLMRequest(BaseModel):
     prompt: str
     image_base64: str
@@ -161,6 +365,27 @@ class VLMResponse(BaseModel):
     response: str
     timestamp: datetime
 
+class VLMBatchRequest(BaseModel):
+    prompt: str
+    images_base64: List[str] = []
+    video_base64: Optional[str] = None
+    frame_interval: float = Field(1.0, gt=0)  # Seconds between sampled video frames
+    summarize: bool = False
+    user_name: str = "User"
+
+class VLMBatchItem(BaseModel):
+    index: int
+    response: str
+    duplicate_of: Optional[int] = None
+
+class VLMBatchResponse(BaseModel):
+    results: List[VLMBatchItem]
+    summary: Optional[str] = None
+    analyzed: int
+    skipped_duplicates: int
+    truncated: bool = False  # The video had more to show than vlm_batch_max_images / vlm_video_max_frames allow
+    timestamp: datetime
+
 class TTSRequest(BaseModel):
     text: str
     voice: str = "default"
@@ -170,12 +395,32 @@ class TTSRequest(BaseModel):
 class WhisperResponse(BaseModel):
     text: str
     duration: float
+    language: Optional[str] = None
+    profile: str
+    decode_time: float
     timestamp: datetime
 
 class TTSResponse(BaseModel):
     audio_base64: str
     timestamp: datetime
 
+class RateLimitUpdate(BaseModel):
+    capacity: Optional[float] = Field(None, gt=0)
+    refill_rate: Optional[float] = Field(None, gt=0)
+    costs: Optional[Dict[str, float]] = None
+    enabled: Optional[bool] = None
+
+class CapacityUpdate(BaseModel):
+    whisper_workers: Optional[int] = Field(None, ge=1, le=64)
+    tts_workers: Optional[int] = Field(None, ge=1, le=64)
+    ollama_max_concurrent: Optional[int] = Field(None, ge=1, le=128)
+    ollama_bulk_max_concurrent: Optional[int] = Field(None, ge=0, le=128)
+    ollama_concurrency_bounds: Optional[List[int]] = Field(None, min_length=2, max_length=2)
+    whisper_max_concurrent: Optional[int] = Field(None, ge=1, le=128)
+    whisper_concurrency_bounds: Optional[List[int]] = Field(None, min_length=2, max_length=2)
+    adaptive_concurrency: Optional[bool] = None
+    note: Optional[str] = None
+
 class CertificateRequest(BaseModel):
     name: str
     date: str
@@ -185,6 +430,9 @@ class CertificateRequest(BaseModel):
 async def init_whisper_model():
     """Initialize Whisper model on GPU 1 with optimization"""
     global whisper_model
+    import torch
+    import whisper
+    from weights import can_map, load_whisper_model
     try:
         if torch.cuda.is_available():
             gpu_count = torch.cuda.device_count()
@@ -203,7 +451,15 @@ async def init_whisper_model():
             logger.info("CUDA not available, loading Whisper model on CPU...")
         
         # Load model with optimization
-        whisper_model = whisper.load_model("base", device=device)
+        load_start = time.time()
+        mapped = CONFIG["whisper_mmap_weights"] and can_map(CONFIG["whisper_model"])
+        if mapped:
+            whisper_model = load_whisper_model(CONFIG["whisper_model"], device, CONFIG["whisper_weights_dir"])
+        else:
+            whisper_model = whisper.load_model(CONFIG["whisper_model"], device=device,
+                                               download_root=CONFIG["whisper_weights_dir"])
+        logger.info(f"Whisper {CONFIG['whisper_model']} loaded in {time.time() - load_start:.2f}s "
+                    f"({'memory-mapped' if mapped else 'unpickled'})")
         
         # Optimize for inference
         if device.startswith("cuda"):
@@ -219,6 +475,7 @@ async def init_whisper_model():
 
 async def init_tts_model():
     """Initialize gTTS with connection pooling"""
+    from gtts import gTTS
     try:
         logger.info("Initializing gTTS with connection pooling...")
         
@@ -238,22 +495,34 @@ async def init_tts_model():
         raise
 
 async def init_ollama():
-    """Initialize Ollama with connection optimization"""
+    """Initialize the Ollama host pool and check every host"""
+    global ollama_pool
     try:
-        logger.info("Initializing Ollama with connection optimization...")
+        hosts = [host if "://" in host else f"http://{host}" for host in CONFIG["ollama_hosts"]]
+        logger.info(f"Initializing Ollama pool with {len(hosts)} host(s)...")
         
-        # Test Ollama connection
-        try:
-            models = await asyncio.to_thread(ollama.list)
-            logger.info(f"Ollama connected, available models: {len(models.get('models', []))}")
-        except Exception as e:
-            logger.warning(f"Ollama connection test failed: {e}")
+        ollama_pool = OllamaPool(
+            hosts,
+            health_interval=CONFIG["ollama_health_interval"],
+            hedge_multiplier=CONFIG["ollama_hedge_multiplier"],
+            hedge_min_delay=CONFIG["ollama_hedge_min_delay"]
+        )
+        await ollama_pool.start()
+        
+        for host in ollama_pool.hosts:
+            if host.healthy:
+                logger.info(f"Ollama host {host.url} connected, available models: {len(host.models)}")
+            else:
+                logger.warning(f"Ollama connection test failed for {host.url}: {host.last_error}")
             
         logger.info("Ollama initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize Ollama: {e}")
         raise
 
+class CallerGone(Exception):
+    """The caller stopped waiting before its queued work started"""
+
 # Optimized worker functions
 class WhisperWorker:
     def __init__(self, worker_id: int):
@@ -269,29 +538,55 @@ class WhisperWorker:
                 if task is None:
                     break
                     
-                audio_file, result_future = task
+                audio_file, language, profile, deadline, result_future = task
                 
-                await gpu_manager.acquire_gpu_1()
                 try:
+                    if result_future.done():
+                        # Caller timed out or went away while this was queued (its audio file may be gone)
+                        gpu_manager.cancellations.dropped("whisper")
+                        continue
+                    
                     start_time = time.time()
-                    logger.info(f"Worker {self.worker_id} processing audio: {audio_file}")
+                    logger.info(f"Worker {self.worker_id} processing audio ({profile}, {language or 'auto'}): {audio_file}")
                     
                     if whisper_model is None:
                         raise Exception("Whisper model not loaded")
                     
-                    # Process in thread to avoid blocking
-                    result = await asyncio.to_thread(whisper_model.transcribe, audio_file)
+                    options = dict(WHISPER_PROFILES[profile])
+                    if options.get("fp16") and whisper_model.device.type != "cuda":
+                        options["fp16"] = False
+                    if language:
+                        # Skips the language-detection pass
+                        options["language"] = language
+                    
+                    # Process in thread to avoid blocking. Past the caller's deadline the
+                    # slot wait gives up; a caller gone by the time the slot frees up is
+                    # dropped too (its audio file may be gone)
+                    async with gpu_manager.gpu_1(kind="whisper", deadline=deadline):
+                        if result_future.done():
+                            raise CallerGone()
+                        decode_start = time.time()
+                        result = await asyncio.to_thread(whisper_model.transcribe, audio_file, **options)
+                        decode_time = time.time() - decode_start
                     
                     duration = time.time() - start_time
-                    logger.info(f"Worker {self.worker_id} completed in {duration:.2f}s")
+                    logger.info(f"Worker {self.worker_id} completed in {duration:.2f}s (decode {decode_time:.2f}s)")
                     
                     if not result_future.cancelled():
                         result_future.set_result({
                             "text": result["text"],
                             "duration": result.get("duration", 0),
+                            "language": result.get("language", language),
+                            "profile": profile,
+                            "decode_time": decode_time,
                             "success": True
                         })
-                        
+                
+                except asyncio.TimeoutError:
+                    # Deadline passed while waiting for the slot; counted as dropped by the slot
+                    pass
+                except CallerGone:
+                    gpu_manager.cancellations.dropped("whisper")
                 except Exception as e:
                     logger.error(f"Worker {self.worker_id} error: {str(e)}")
                     if not result_future.cancelled():
@@ -300,7 +595,6 @@ class WhisperWorker:
                             "success": False
                         })
                 finally:
-                    gpu_manager.release_gpu_1()
                     self.queue.task_done()
                     
             except asyncio.TimeoutError:
@@ -308,11 +602,13 @@ class WhisperWorker:
             except Exception as e:
                 logger.error(f"Whisper worker {self.worker_id} error: {e}")
     
-    async def add_task(self, audio_file: str) -> Dict[str, Any]:
+    async def add_task(self, audio_file: str, language: Optional[str] = None, profile: str = "accurate") -> Dict[str, Any]:
         """Add task to worker queue"""
-        result_future = asyncio.Future()
-        await self.queue.put((audio_file, result_future))
-        return await asyncio.wait_for(result_future, timeout=CONFIG["request_timeout"])
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + CONFIG["request_timeout"]
+        result_future = loop.create_future()
+        await self.queue.put((audio_file, language, profile, deadline, result_future))
+        return await asyncio.wait_for(result_future, timeout=deadline - loop.time())
 
 class TTSWorker:
     def __init__(self, worker_id: int):
@@ -322,6 +618,7 @@ class TTSWorker:
         
     async def start(self):
         """Start the worker"""
+        from gtts import gTTS
         while self.running:
             try:
                 task = await asyncio.wait_for(self.queue.get(), timeout=1.0)
@@ -331,6 +628,11 @@ class TTSWorker:
                 text, voice, speed, result_future = task
                 
                 try:
+                    if result_future.done():
+                        # Caller timed out or went away while this was queued
+                        gpu_manager.cancellations.dropped("tts")
+                        continue
+                    
                     start_time = time.time()
                     logger.info(f"TTS Worker {self.worker_id} processing: {text[:50]}...")
                     
@@ -356,11 +658,11 @@ class TTSWorker:
                     
                     slow = speed < 0.8
                     
-                    # Generate audio using gTTS in thread
-                    tts = gTTS(text=text, lang=lang, slow=slow, tld=tld)
-                    
+                    # Generate audio using gTTS in thread (the constructor tokenizes, keep it off the loop too)
                     with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as tmp_file:
-                        await asyncio.to_thread(tts.save, tmp_file.name)
+                        await asyncio.to_thread(
+                            lambda: gTTS(text=text, lang=lang, slow=slow, tld=tld).save(tmp_file.name)
+                        )
                         
                         async with aiofiles.open(tmp_file.name, "rb") as f:
                             audio_data = await f.read()
@@ -406,61 +708,492 @@ class TTSWorker:
 whisper_worker_pool = []
 tts_worker_pool = []
 
+stats_sampler = SystemStatsSampler(collect_system_stats, interval=CONFIG["stats_interval"])
+
+def _write_temp_file(data: bytes, suffix: str) -> str:
+    """Write bytes to a named temporary file and return its path"""
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp_file:
+        tmp_file.write(data)
+        return tmp_file.name
+
+class ModelService:
+    """Owns the Whisper model, the worker pools and the GPU semaphores.
+
+    Runs inside the API process when CONFIG["api_workers"] is 1, otherwise
+    inside the model server process where the HTTP workers reach it over IPC.
+    """
+
+    # Methods callable through the model server socket
+    RPC_METHODS = {
+        "transcribe", "synthesize", "chat", "status", "loop_stats",
+        "admit", "configure_rate_limits", "capacity", "resize", "analyze_images",
+        "system_stats", "stats_history", "voice_pipeline", "report_request_stats", "whisper_languages",
+    }
+    # RPC_METHODS that are async generators; the proxy exposes them as streams
+    STREAM_METHODS = {"voice_pipeline"}
+
+    def __init__(self):
+        self.capacity_changes = deque(maxlen=200)
+        # Last language Whisper heard per session, used as the next clip's hint
+        self.session_languages = OrderedDict()
+        # Latest PerformanceMonitor.snapshot() of each API worker, by pid
+        self.worker_reports = {}
+
+    async def start(self):
+        """Load models and start worker pools"""
+        global executor
+
+        # Initialize thread pool executor with more workers
+        executor = ThreadPoolExecutor(max_workers=CONFIG["max_workers"])
+
+        # Initialize models
+        await init_ollama()
+        await init_whisper_model()
+        await init_tts_model()
+
+        # Create worker pools
+        logger.info(f"Creating {CONFIG['whisper_workers']} Whisper workers...")
+        for i in range(CONFIG["whisper_workers"]):
+            worker = WhisperWorker(i)
+            whisper_worker_pool.append(worker)
+            asyncio.create_task(worker.start())
+
+        logger.info(f"Creating {CONFIG['tts_workers']} TTS workers...")
+        for i in range(CONFIG["tts_workers"]):
+            worker = TTSWorker(i)
+            tts_worker_pool.append(worker)
+            asyncio.create_task(worker.start())
+
+        # GPU memory optimization
+        import torch
+        if torch.cuda.is_available():
+            for i in range(torch.cuda.device_count()):
+                torch.cuda.empty_cache()
+                torch.cuda.set_per_process_memory_fraction(CONFIG["gpu_memory_fraction"], device=i)
+
+        stats_sampler.start()
+        logger.info("All optimized models loaded and workers started successfully!")
+
+    async def stop(self):
+        """Stop workers and release GPU memory"""
+        stats_sampler.stop()
+        for worker in whisper_worker_pool:
+            worker.running = False
+            await worker.queue.put(None)
+
+        for worker in tts_worker_pool:
+            worker.running = False
+            await worker.queue.put(None)
+
+        executor.shutdown(wait=True)
+        await ollama_pool.stop()
+
+        # Clear GPU memory
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def _capacity(self) -> Dict[str, Any]:
+        gpu_0 = gpu_manager.limits["gpu_0"]
+        gpu_1 = gpu_manager.limits["gpu_1"]
+        return {
+            "whisper_workers": len(whisper_worker_pool),
+            "tts_workers": len(tts_worker_pool),
+            "ollama_max_concurrent": int(gpu_0.limit),
+            "ollama_bulk_max_concurrent": gpu_manager.gpu_0_semaphore.class_limits.get("bulk"),
+            "ollama_concurrency_bounds": [gpu_0.min_limit, gpu_0.max_limit],
+            "whisper_max_concurrent": int(gpu_1.limit),
+            "whisper_concurrency_bounds": [gpu_1.min_limit, gpu_1.max_limit],
+            "adaptive_concurrency": gpu_0.enabled and gpu_1.enabled,
+        }
+
+    async def _resize_pool(self, pool: List[Any], worker_class, size: int):
+        """Grow or shrink a worker pool; removed workers finish their queue before exiting"""
+        while len(pool) < size:
+            worker = worker_class(max((w.worker_id for w in pool), default=-1) + 1)
+            pool.append(worker)
+            asyncio.create_task(worker.start())
+
+        while len(pool) > size:
+            # Retire the least loaded worker. It no longer gets new tasks, and the
+            # sentinel queues up behind the tasks it already has.
+            worker = min(pool, key=lambda w: w.queue.qsize())
+            pool.remove(worker)
+            logger.info(f"Draining {worker_class.__name__} {worker.worker_id} ({worker.queue.qsize()} queued)")
+            asyncio.create_task(worker.queue.put(None))
+
+    async def capacity(self) -> Dict[str, Any]:
+        """Current pool sizes and concurrency limits, with the history of changes"""
+        return {"capacity": self._capacity(), "changes": list(self.capacity_changes)}
+
+    async def resize(self, whisper_workers: Optional[int] = None, tts_workers: Optional[int] = None,
+                     ollama_max_concurrent: Optional[int] = None,
+                     ollama_bulk_max_concurrent: Optional[int] = None,
+                     ollama_concurrency_bounds: Optional[List[int]] = None,
+                     whisper_max_concurrent: Optional[int] = None,
+                     whisper_concurrency_bounds: Optional[List[int]] = None,
+                     adaptive_concurrency: Optional[bool] = None,
+                     changed_by: str = "admin") -> Dict[str, Any]:
+        """Resize worker pools and GPU concurrency limits without a restart"""
+        before = self._capacity()
+
+        if whisper_workers is not None:
+            await self._resize_pool(whisper_worker_pool, WhisperWorker, whisper_workers)
+            CONFIG["whisper_workers"] = whisper_workers
+        if tts_workers is not None:
+            await self._resize_pool(tts_worker_pool, TTSWorker, tts_workers)
+            CONFIG["tts_workers"] = tts_workers
+
+        for name, limit, bounds, config_key in (
+            ("gpu_0", ollama_max_concurrent, ollama_concurrency_bounds, "ollama_max_concurrent"),
+            ("gpu_1", whisper_max_concurrent, whisper_concurrency_bounds, "whisper_max_concurrent"),
+        ):
+            adaptive = gpu_manager.limits[name]
+            min_limit, max_limit = bounds if bounds else (None, None)
+            if limit is not None:
+                # An explicit limit widens the bounds rather than being clamped by them
+                min_limit = min(limit, min_limit or adaptive.min_limit)
+                max_limit = max(limit, max_limit or adaptive.max_limit)
+                CONFIG[config_key] = limit
+            adaptive.configure(min_limit=min_limit, max_limit=max_limit, limit=limit, enabled=adaptive_concurrency)
+
+        if ollama_bulk_max_concurrent is not None:
+            gpu_manager.gpu_0_semaphore.class_limits["bulk"] = ollama_bulk_max_concurrent
+            gpu_manager.gpu_0_semaphore.set_limit(gpu_manager.gpu_0_semaphore.limit)
+            CONFIG["ollama_bulk_max_concurrent"] = ollama_bulk_max_concurrent
+        if adaptive_concurrency is not None:
+            CONFIG["adaptive_concurrency"] = adaptive_concurrency
+
+        after = self._capacity()
+        change = {
+            "timestamp": datetime.now().isoformat(),
+            "changed_by": changed_by,
+            "changes": {key: [before[key], after[key]] for key in after if before[key] != after[key]},
+        }
+        self.capacity_changes.append(change)
+        logger.info(f"Capacity changed by {changed_by}: {change['changes']}")
+        return {"capacity": after, "change": change}
+
+    async def transcribe(self, audio, language: Optional[str] = None, profile: Optional[str] = None,
+                         session: Optional[str] = None) -> Dict[str, Any]:
+        """Transcribe audio bytes (or a shared memory blob) on the least loaded Whisper worker.
+
+        ``language`` "auto" forces detection; None falls back to the language
+        last detected for ``session``. Pass only a client-chosen session id:
+        a shared fallback key would carry one client's language over to others.
+        """
+        profile = profile or CONFIG["whisper_default_profile"]
+        if language is None and session is not None:
+            language = self.session_languages.get(session)
+        elif language == "auto":
+            language = None
+
+        if isinstance(audio, SharedBlob) and audio.path:
+            # ffmpeg reads the segment in place, no copy needed
+            audio_file, owned = audio.path, False
+        else:
+            data = audio.tobytes() if isinstance(audio, SharedBlob) else audio
+            audio_file, owned = await asyncio.to_thread(_write_temp_file, data, ".wav"), True
+
+        try:
+            # Find worker with smallest queue
+            best_worker = min(whisper_worker_pool, key=lambda w: w.queue.qsize())
+            result = await best_worker.add_task(audio_file, language, profile)
+        finally:
+            if owned:
+                os.unlink(audio_file)
+
+        if session is not None and result["success"] and result.get("language"):
+            self.session_languages[session] = result["language"]
+            self.session_languages.move_to_end(session)
+            if len(self.session_languages) > 10000:
+                self.session_languages.popitem(last=False)
+        return result
+
+    async def synthesize(self, text: str, voice: str, speed: float) -> Dict[str, Any]:
+        """Generate speech on the least loaded TTS worker"""
+        # Find worker with smallest queue
+        best_worker = min(tts_worker_pool, key=lambda w: w.queue.qsize())
+        return await best_worker.add_task(text, voice, speed)
+
+    async def chat(self, model: str, prompt: str, images: Optional[List[Any]] = None,
+                   priority: str = "interactive") -> str:
+        """Run a single-turn Ollama chat on GPU 0 and return the reply text"""
+        message = {"role": "user", "content": prompt}
+        if images:
+            message["images"] = [image.tobytes() if isinstance(image, SharedBlob) else image for image in images]
+
+        # Hedging duplicates work, so only for interactive text chat
+        hedge = CONFIG["ollama_hedge_chat"] and not images and priority == "interactive"
+        # The timeout counts from now, so time queued for the slot comes out of it.
+        # Cancelling (timeout or caller gone) closes the HTTP request, which stops Ollama generating
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + CONFIG["request_timeout"]
+        async with gpu_manager.gpu_0(priority, kind="vlm" if images else "llm", deadline=deadline):
+            response = await asyncio.wait_for(
+                ollama_pool.chat(model, [message], hedge=hedge),
+                timeout=deadline - loop.time()
+            )
+            return response["message"]["content"]
+
+    async def analyze_images(self, prompt: str, images: List[Any], summary_prompt: Optional[str] = None,
+                             priority: str = "interactive") -> Dict[str, Any]:
+        """Run LLaVA over several images, plus an optional text summary, as one GPU 0 job"""
+        # One request_timeout per model call, counted from now: queueing for the slot uses it up too
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + CONFIG["request_timeout"] * (len(images) + bool(summary_prompt))
+        answers = []
+        async with gpu_manager.gpu_0(priority, sample=False, kind="vlm_batch", deadline=deadline):
+            for image in images:
+                data = image.tobytes() if isinstance(image, SharedBlob) else image
+                response = await asyncio.wait_for(
+                    ollama_pool.chat("llava", [{"role": "user", "content": prompt, "images": [data]}]),
+                    timeout=deadline - loop.time()
+                )
+                answers.append(response["message"]["content"])
+
+            summary = None
+            if summary_prompt:
+                listing = "\n".join(f"{i + 1}. {answer}" for i, answer in enumerate(answers))
+                response = await asyncio.wait_for(
+                    ollama_pool.chat("llama3.2:1b", [{"role": "user", "content": f"{summary_prompt}\n\n{listing}"}]),
+                    timeout=deadline - loop.time()
+                )
+                summary = response["message"]["content"]
+
+        return {"answers": answers, "summary": summary}
+
+    async def voice_pipeline(self, audio, language: Optional[str] = None, profile: Optional[str] = None,
+                             session: Optional[str] = None, voice: str = "default",
+                             speed: float = 1.0) -> AsyncIterator[Dict[str, Any]]:
+        """Transcribe a spoken question, stream the LLM answer and speak it sentence by sentence.
+
+        Yields events: "transcript", "text" (reply deltas), "audio" (one per
+        sentence, in order, synthesized while the LLM is still generating),
+        "error" and finally "done" with timings in seconds since the audio arrived.
+        """
+        started = time.monotonic()
+        timings: Dict[str, float] = {}
+
+        def mark(name: str) -> float:
+            timings.setdefault(name, time.monotonic() - started)
+            return timings[name]
+
+        transcript = await self.transcribe(audio, language, profile, session)
+        if not transcript["success"]:
+            yield {"type": "error", "stage": "whisper", "error": transcript["error"]}
+            return
+        question = transcript["text"].strip()
+        yield {"type": "transcript", "text": question, "language": transcript.get("language"),
+               "elapsed": mark("transcribed")}
+        if not question:
+            yield {"type": "error", "stage": "whisper", "error": "No speech detected"}
+            return
+
+        events: asyncio.Queue = asyncio.Queue()
+        # (sentence, TTS task) in reply order, None once the reply is complete
+        speech: asyncio.Queue = asyncio.Queue()
+        reply: List[str] = []
+
+        def speak(sentence: str):
+            speech.put_nowait((sentence, asyncio.create_task(self.synthesize(sentence, voice, speed))))
+
+        async def generate():
+            splitter = SentenceSplitter()
+            loop = asyncio.get_running_loop()
+            try:
+                deadline = loop.time() + CONFIG["request_timeout"]
+                async with gpu_manager.gpu_0(kind="llm", deadline=deadline):
+                    stream = ollama_pool.chat_stream(
+                        "llama3.2:1b", [{"role": "user", "content": build_llm_prompt(question)}]
+                    )
+                    try:
+                        while True:
+                            try:
+                                delta = await asyncio.wait_for(stream.__anext__(), deadline - loop.time())
+                            except StopAsyncIteration:
+                                break
+                            mark("first_token")
+                            reply.append(delta)
+                            events.put_nowait({"type": "text", "delta": delta})
+                            for sentence in splitter.feed(delta):
+                                speak(sentence)
+                    finally:
+                        await stream.aclose()
+                rest = splitter.flush()
+                if rest:
+                    speak(rest)
+            except asyncio.TimeoutError:
+                events.put_nowait({"type": "error", "stage": "llm", "error": "LLM request timeout"})
+            except Exception as e:
+                logger.error(f"Voice pipeline LLM error: {e}")
+                events.put_nowait({"type": "error", "stage": "llm", "error": str(e)})
+            finally:
+                speech.put_nowait(None)
+
+        async def play_in_order():
+            index = 0
+            while (item := await speech.get()) is not None:
+                sentence, task = item
+                try:
+                    result = await task
+                except asyncio.TimeoutError:
+                    result = {"success": False, "error": "TTS processing timeout"}
+                if result["success"]:
+                    elapsed = mark("first_audio") if index == 0 else time.monotonic() - started
+                    events.put_nowait({"type": "audio", "index": index, "text": sentence,
+                                       "audio_base64": result["audio_base64"], "elapsed": elapsed})
+                else:
+                    events.put_nowait({"type": "error", "stage": "tts", "index": index, "error": result["error"]})
+                index += 1
+
+        pipeline = asyncio.gather(generate(), play_in_order())
+        pipeline.add_done_callback(lambda _: events.put_nowait(None))
+        try:
+            while (event := await events.get()) is not None:
+                yield event
+            yield {"type": "done", "reply": "".join(reply), "timings": {**timings, "total": mark("total")}}
+        finally:
+            # Listener went away: stop generating and drop sentences not yet spoken
+            pipeline.cancel()
+            while not speech.empty():
+                item = speech.get_nowait()
+                if item is not None:
+                    item[1].cancel()
+
+    async def system_stats(self) -> Dict[str, Any]:
+        """Latest CPU / memory / GPU / queue sample"""
+        return stats_sampler.snapshot()
+
+    async def stats_history(self, resolution: str = "1s", limit: Optional[int] = None) -> Dict[str, Any]:
+        return stats_sampler.history(resolution, limit)
+
+    async def whisper_languages(self) -> Dict[str, Any]:
+        """Language codes Whisper accepts, and the names that map to them"""
+        from whisper.tokenizer import LANGUAGES, TO_LANGUAGE_CODE
+        return {"codes": sorted(LANGUAGES), "aliases": TO_LANGUAGE_CODE}
+
+    async def status(self) -> Dict[str, Any]:
+        """Worker pool and GPU state"""
+        import torch
+        return {
+            "whisper_workers": len(whisper_worker_pool),
+            "tts_workers": len(tts_worker_pool),
+            "whisper_queue_sizes": [w.queue.qsize() for w in whisper_worker_pool],
+            "tts_queue_sizes": [w.queue.qsize() for w in tts_worker_pool],
+            "gpu_0_available": torch.cuda.is_available(),
+            "gpu_1_available": torch.cuda.is_available() and torch.cuda.device_count() > 1,
+            "gpu_memory": gpu_memory_summary(stats_sampler.snapshot()),
+            "concurrency": gpu_manager.stats(),
+            "rate_limits": rate_limiter.stats(),
+            "ollama": ollama_pool.stats(),
+            "cancellations": gpu_manager.cancellations.stats(),
+        }
+
+    async def report_request_stats(self, worker: int, request_stats: Dict[str, int],
+                                   request_times: List[float]) -> Dict[str, Any]:
+        """Store an API worker's request counters and return the totals over all workers
+        (see report_request_stats_forever)"""
+        self.worker_reports[worker] = {
+            "request_stats": request_stats,
+            "request_times": request_times,
+            "reported": time.monotonic(),
+        }
+        return self.request_totals()
+
+    def request_totals(self) -> Dict[str, Any]:
+        """request_stats summed over all API workers, with their recent response times"""
+        # A worker that stopped reporting has exited: keep its counts, but not as active requests
+        stale = time.monotonic() - 10 * CONFIG["stats_interval"]
+        totals = {key: 0 for key in request_stats}
+        request_times = []
+        for report in self.worker_reports.values():
+            for key, value in report["request_stats"].items():
+                if key != "active_requests" or report["reported"] >= stale:
+                    totals[key] = totals.get(key, 0) + value
+            request_times.extend(report["request_times"])
+        return {"request_stats": totals, "request_times": request_times}
+
+    async def admit(self, key: str, endpoint: str, units: int = 1) -> float:
+        """Charge a session's token bucket; returns 0 if admitted, else seconds to wait"""
+        return rate_limiter.take(key, endpoint, units)
+
+    async def configure_rate_limits(self, **changes) -> Dict[str, Any]:
+        return rate_limiter.configure(**changes)
+
+    async def loop_stats(self) -> Dict[str, Any]:
+        """Event-loop lag of the process hosting the models"""
+        return loop_monitor.stats()
+
+class RemoteModelService:
+    """Proxy for a ModelService running in the model server process"""
+
+    def __init__(self, socket_path: str):
+        self.client = RPCClient(socket_path)
+
+    async def start(self):
+        """Connect to the model server, waiting while it loads models"""
+        deadline = time.time() + CONFIG["model_server_connect_timeout"]
+        while True:
+            try:
+                await self.client.connect()
+                logger.info(f"Connected to model server at {self.client.path}")
+                return
+            except (FileNotFoundError, ConnectionError):
+                if time.time() > deadline:
+                    raise
+                await asyncio.sleep(1.0)
+
+    async def stop(self):
+        await self.client.close()
+
+    def __getattr__(self, name):
+        if name in ModelService.STREAM_METHODS:
+            return functools.partial(self.client.stream, name)
+        if name in ModelService.RPC_METHODS:
+            return functools.partial(self.client.call, name)
+        raise AttributeError(name)
+
+model_service = None
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager with optimizations"""
-    global executor, whisper_worker_pool, tts_worker_pool
-    
+    global model_service
+
     logger.info("Starting Optimized AI Demo Backend...")
-    
-    # Initialize thread pool executor with more workers
-    executor = ThreadPoolExecutor(max_workers=CONFIG["max_workers"])
-    
-    # Initialize models
-    await init_ollama()
-    await init_whisper_model()
-    await init_tts_model()
-    
-    # Create worker pools
-    logger.info(f"Creating {CONFIG['whisper_workers']} Whisper workers...")
-    for i in range(CONFIG["whisper_workers"]):
-        worker = WhisperWorker(i)
-        whisper_worker_pool.append(worker)
-        asyncio.create_task(worker.start())
-    
-    logger.info(f"Creating {CONFIG['tts_workers']} TTS workers...")
-    for i in range(CONFIG["tts_workers"]):
-        worker = TTSWorker(i)
-        tts_worker_pool.append(worker)
-        asyncio.create_task(worker.start())
-    
-    # GPU memory optimization
-    if torch.cuda.is_available():
-        for i in range(torch.cuda.device_count()):
-            torch.cuda.empty_cache()
-            torch.cuda.set_per_process_memory_fraction(CONFIG["gpu_memory_fraction"], device=i)
-    
-    logger.info("All optimized models loaded and workers started successfully!")
-    
+    loop_monitor.start()
+
+    if os.getenv("USE_MODEL_SERVER") == "1":
+        model_service = RemoteModelService(CONFIG["model_server_socket"])
+    else:
+        model_service = ModelService()
+    await model_service.start()
+    stats_reporter = asyncio.create_task(report_request_stats_forever())
+
     yield
-    
+
     # Cleanup
     logger.info("Shutting down optimized backend...")
-    
-    # Stop workers
-    for worker in whisper_worker_pool:
-        worker.running = False
-        await worker.queue.put(None)
-    
-    for worker in tts_worker_pool:
-        worker.running = False
-        await worker.queue.put(None)
-    
-    executor.shutdown(wait=True)
-    
-    # Clear GPU memory
-    if torch.cuda.is_available():
-        torch.cuda.empty_cache()
+    stats_reporter.cancel()
+    await model_service.stop()
+    loop_monitor.stop()
+
+def run_model_server(socket_path: str):
+    """Entry point of the model server process: own the models and serve them over IPC"""
+    async def serve():
+        loop_monitor.start()
+        service = ModelService()
+        await service.start()
+        server = RPCServer(service, socket_path, ModelService.RPC_METHODS)
+        await server.start()
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+            await service.stop()
+
+    asyncio.run(serve())
 
 # Create FastAPI app
 app = FastAPI(
@@ -479,15 +1212,86 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if CONFIG["capture_dir"]:
+    app.add_middleware(TrafficCapture, directory=CONFIG["capture_dir"], sample_rate=CONFIG["capture_payload_rate"])
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Guard for /api/admin/* endpoints"""
+    if not ADMIN_TOKEN or not secrets.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+def session_key(session_id: Optional[str], user_name: Optional[str]) -> str:
+    """Identify a kiosk by its X-Session-Id header, falling back to the user name"""
+    return f"session:{session_id}" if session_id else f"user:{user_name or 'User'}"
+
+class ClientDisconnected(Exception):
+    """The HTTP client went away before its response was ready"""
+
+async def cancel_on_disconnect(http_request: Request, awaitable):
+    """Await ``awaitable``, cancelling it - and the queued or running model work behind it - if the client disconnects"""
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=CONFIG["disconnect_poll_interval"])
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        task.cancel()
+
+async def enforce_rate_limit(endpoint: str, session_id: Optional[str], user_name: Optional[str], units: int = 1):
+    """Reject with 429 when the session's token bucket cannot pay for this request"""
+    key = session_key(session_id, user_name)
+    retry_after = await model_service.admit(key=key, endpoint=endpoint, units=units)
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests from this session, please wait a moment",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
+_system_snapshot = {"expires": 0.0, "value": {}}
+
+async def system_snapshot() -> Dict[str, Any]:
+    """Latest sampler snapshot, fetched from the model process at most once per sampling interval"""
+    if time.monotonic() >= _system_snapshot["expires"]:
+        _system_snapshot["value"] = await model_service.system_stats()
+        _system_snapshot["expires"] = time.monotonic() + CONFIG["stats_interval"]
+    return _system_snapshot["value"]
+
+_request_totals: Dict[str, Any] = {"value": None}
+
+async def report_request_stats():
+    """Send this worker's counters to the model service, which sums them over all workers, and keep the totals"""
+    _request_totals["value"] = await model_service.report_request_stats(worker=os.getpid(), **monitor.snapshot())
+
+async def report_request_stats_forever():
+    while True:
+        await asyncio.sleep(CONFIG["stats_interval"])
+        try:
+            await report_request_stats()
+        except Exception as e:
+            logger.warning(f"Could not report request stats: {e}")
+
+async def request_totals() -> Dict[str, Any]:
+    """Request counters of all API workers as of the last periodic report, at most about two stats
+    intervals old; only the first call before any report goes to the model service"""
+    if _request_totals["value"] is None:
+        await report_request_stats()
+    return _request_totals["value"]
+
 # Health check endpoint with performance stats
 @app.get("/health")
 async def health_check():
-    stats = monitor.get_stats()
+    system = await system_snapshot()
+    stats = performance_stats(await request_totals(), system)
+    gpu_count = len(stats["gpu_memory"])
     return {
         "status": "healthy",
         "timestamp": datetime.now(),
-        "gpu_available": torch.cuda.is_available(),
-        "gpu_count": torch.cuda.device_count() if torch.cuda.is_available() else 0,
+        "gpu_available": gpu_count > 0,
+        "gpu_count": gpu_count,
         "performance": stats,
         "config": CONFIG
     }
@@ -591,163 +1395,341 @@ def detect_language(text: str) -> str:
     else:
         return "english"
 
+def build_llm_prompt(message: str) -> str:
+    """Ask the LLM to answer in the language of the message"""
+    if detect_language(message) == "malay":
+        return f"Jawab dalam Bahasa Malaysia: {message}"
+    return f"Please respond in English: {message}"
+
 # Optimized LLM endpoint
 @app.post("/api/llm", response_model=LLMResponse)
-async def llm_chat(request: LLMRequest):
+async def llm_chat(request: LLMRequest, http_request: Request, x_session_id: Optional[str] = Header(None)):
     """Chat with LLM using Ollama Llama3.2:1b on GPU 0 - Optimized"""
+    await enforce_rate_limit("llm", x_session_id, request.user_name)
     start_time = time.time()
     monitor.start_request()
     request_stats["llm_requests"] += 1
     
     try:
-        await gpu_manager.acquire_gpu_0()
-        try:
-            detected_lang = detect_language(request.message)
-            
-            if detected_lang == "malay":
-                prompt = f"Jawab dalam Bahasa Malaysia: {request.message}"
-            else:
-                prompt = f"Please respond in English: {request.message}"
-            
-            # Use asyncio.to_thread for better concurrency
-            response = await asyncio.wait_for(
-                asyncio.to_thread(
-                    ollama.chat,
-                    model="llama3.2:1b",
-                    messages=[{
-                        "role": "user",
-                        "content": prompt
-                    }]
-                ),
-                timeout=CONFIG["request_timeout"]
-            )
-            
-            duration = time.time() - start_time
-            monitor.end_request(duration, True)
-            
-            return LLMResponse(
-                response=response["message"]["content"],
-                timestamp=datetime.now()
-            )
-            
-        finally:
-            gpu_manager.release_gpu_0()
+        content = await cancel_on_disconnect(
+            http_request,
+            model_service.chat(model="llama3.2:1b", prompt=build_llm_prompt(request.message))
+        )
+        
+        duration = time.time() - start_time
+        monitor.end_request(duration, True)
+        
+        return LLMResponse(
+            response=content,
+            timestamp=datetime.now()
+        )
             
     except asyncio.TimeoutError:
         duration = time.time() - start_time
         monitor.end_request(duration, False)
         logger.error("LLM request timeout")
         raise HTTPException(status_code=408, detail="LLM request timeout")
+    except ClientDisconnected:
+        duration = time.time() - start_time
+        monitor.end_request(duration, False)
+        logger.info("LLM request abandoned by client")
+        raise HTTPException(status_code=499, detail="Client closed request")
     except Exception as e:
         duration = time.time() - start_time
         monitor.end_request(duration, False)
         logger.error(f"LLM error: {e}")
         raise HTTPException(status_code=500, detail=f"LLM processing failed: {str(e)}")
 
+# nginx buffers proxied responses by default; streamed NDJSON lines must reach the client as they are written
+STREAM_HEADERS = {"X-Accel-Buffering": "no"}
+
+# Batch LLM endpoint
+@app.post("/api/llm/batch")
+async def llm_batch(request: LLMBatchRequest, x_session_id: Optional[str] = Header(None)):
+    """Answer many prompts in one request, streaming each result as an NDJSON line as it completes"""
+    if not request.prompts:
+        raise HTTPException(status_code=400, detail="No prompts given")
+    if len(request.prompts) > CONFIG["llm_batch_max_prompts"]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many prompts, maximum is {CONFIG['llm_batch_max_prompts']}"
+        )
+    
+    await enforce_rate_limit("llm_batch", x_session_id, request.user_name, units=len(request.prompts))
+    
+    parallel = max(1, min(request.parallel or CONFIG["llm_batch_parallel"], CONFIG["llm_batch_parallel"]))
+    limiter = Semaphore(parallel)
+    request_stats["llm_requests"] += len(request.prompts)
+    
+    async def answer(index: int, message: str) -> Dict[str, Any]:
+        async with limiter:
+            start_time = time.time()
+            monitor.start_request()
+            try:
+                # Bulk priority so interactive chat keeps its GPU 0 slots
+                content = await model_service.chat(model="llama3.2:1b", prompt=build_llm_prompt(message), priority="bulk")
+                duration = time.time() - start_time
+                monitor.end_request(duration, True)
+                return {"index": index, "response": content, "error": None, "duration": duration}
+            except asyncio.CancelledError:
+                monitor.end_request(time.time() - start_time, False)
+                raise
+            except Exception as e:
+                duration = time.time() - start_time
+                monitor.end_request(duration, False)
+                error = "LLM request timeout" if isinstance(e, asyncio.TimeoutError) else str(e)
+                logger.error(f"LLM batch item {index} error: {error}")
+                return {"index": index, "response": None, "error": error, "duration": duration}
+    
+    async def stream_results():
+        tasks = [asyncio.create_task(answer(i, prompt)) for i, prompt in enumerate(request.prompts)]
+        failed = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                if result["error"] is not None:
+                    failed += 1
+                yield json.dumps(result) + "\n"
+            yield json.dumps({"done": True, "total": len(tasks), "failed": failed}) + "\n"
+        finally:
+            # Client went away: stop queued prompts from taking GPU time
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson", headers=STREAM_HEADERS)
+
 # Optimized VLM endpoint
 @app.post("/api/vlm", response_model=VLMResponse)
-async def vlm_analyze(request: VLMRequest):
+async def vlm_analyze(request: VLMRequest, http_request: Request, x_session_id: Optional[str] = Header(None)):
     """Analyze image with VLM using Ollama LLaVA on GPU 0 - Optimized"""
+    await enforce_rate_limit("vlm", x_session_id, request.user_name)
     start_time = time.time()
     monitor.start_request()
     request_stats["vlm_requests"] += 1
     
     try:
-        await gpu_manager.acquire_gpu_0()
-        try:
-            detected_lang = detect_language(request.prompt)
-            
-            if detected_lang == "malay":
-                prompt = f"Jawab dalam Bahasa Malaysia: {request.prompt}"
-            else:
-                prompt = f"Please respond in English: {request.prompt}"
-            
-            # Decode base64 image
-            image_data = base64.b64decode(request.image_base64.split(',')[1] if ',' in request.image_base64 else request.image_base64)
-            
-            # Save temporary image
-            with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as tmp_file:
-                tmp_file.write(image_data)
-                tmp_file.flush()
-                
-                # Use asyncio.to_thread for better concurrency
-                response = await asyncio.wait_for(
-                    asyncio.to_thread(
-                        ollama.chat,
-                        model="llava",
-                        messages=[{
-                            "role": "user",
-                            "content": prompt,
-                            "images": [tmp_file.name]
-                        }]
-                    ),
-                    timeout=CONFIG["request_timeout"]
-                )
-                
-                os.unlink(tmp_file.name)
-                
-                duration = time.time() - start_time
-                monitor.end_request(duration, True)
-                
-                return VLMResponse(
-                    response=response["message"]["content"],
-                    timestamp=datetime.now()
-                )
-                
-        finally:
-            gpu_manager.release_gpu_0()
+        detected_lang = detect_language(request.prompt)
+        
+        if detected_lang == "malay":
+            prompt = f"Jawab dalam Bahasa Malaysia: {request.prompt}"
+        else:
+            prompt = f"Please respond in English: {request.prompt}"
+        
+        # Decode base64 image
+        image_data = base64.b64decode(request.image_base64.split(',')[1] if ',' in request.image_base64 else request.image_base64)
+        
+        content = await cancel_on_disconnect(
+            http_request,
+            model_service.chat(model="llava", prompt=prompt, images=[image_data])
+        )
+        
+        duration = time.time() - start_time
+        monitor.end_request(duration, True)
+        
+        return VLMResponse(
+            response=content,
+            timestamp=datetime.now()
+        )
             
     except asyncio.TimeoutError:
         duration = time.time() - start_time
         monitor.end_request(duration, False)
         logger.error("VLM request timeout")
         raise HTTPException(status_code=408, detail="VLM request timeout")
+    except ClientDisconnected:
+        duration = time.time() - start_time
+        monitor.end_request(duration, False)
+        logger.info("VLM request abandoned by client")
+        raise HTTPException(status_code=499, detail="Client closed request")
     except Exception as e:
         duration = time.time() - start_time
         monitor.end_request(duration, False)
         logger.error(f"VLM error: {e}")
         raise HTTPException(status_code=500, detail=f"VLM processing failed: {str(e)}")
 
+def _prepare_vlm_batch(request: VLMBatchRequest) -> Tuple[List[Optional[bytes]], List[Optional[int]], bool]:
+    """Decode images / sample video frames and find near-duplicates (CPU work, run in a thread).
+
+    The whole video is sampled and only distinct frames count towards
+    vlm_batch_max_images; see media.collect_distinct_images for the result.
+    """
+    images = [
+        base64.b64decode(image.split(',')[1] if ',' in image else image)
+        for image in request.images_base64
+    ]
+    collect = functools.partial(
+        collect_distinct_images,
+        images,
+        max_distance=CONFIG["vlm_dedup_distance"],
+        max_unique=CONFIG["vlm_batch_max_images"],
+        max_frames=CONFIG["vlm_video_max_frames"]
+    )
+    if not request.video_base64:
+        return collect(frames=())
+
+    video = request.video_base64
+    video_data = base64.b64decode(video.split(',')[1] if ',' in video else video)
+    # Closing stops decoding (and removes the temp file) when a limit is hit early
+    with closing(iter_video_frames(video_data, request.frame_interval)) as frames:
+        return collect(frames=frames)
+
+# Batch VLM endpoint
+@app.post("/api/vlm/batch", response_model=VLMBatchResponse)
+async def vlm_batch(request: VLMBatchRequest, http_request: Request, x_session_id: Optional[str] = Header(None)):
+    """Analyze several images or frames of a short video, skipping near-identical ones.
+
+    "truncated" in the response says the video had more distinct frames than
+    vlm_batch_max_images (or was longer than vlm_video_max_frames samples).
+    """
+    if not request.images_base64 and not request.video_base64:
+        raise HTTPException(status_code=400, detail="No images or video given")
+    if len(request.images_base64) > CONFIG["vlm_batch_max_images"]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many images, maximum is {CONFIG['vlm_batch_max_images']}"
+        )
+    
+    try:
+        images, duplicate_of, truncated = await asyncio.to_thread(_prepare_vlm_batch, request)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not read images: {str(e)}")
+    if not images:
+        raise HTTPException(status_code=400, detail="No frames could be read from the video")
+    
+    unique = [index for index, original in enumerate(duplicate_of) if original is None]
+    await enforce_rate_limit("vlm", x_session_id, request.user_name, units=len(unique))
+    
+    start_time = time.time()
+    monitor.start_request()
+    request_stats["vlm_requests"] += len(unique)
+    
+    try:
+        malay = detect_language(request.prompt) == "malay"
+        if malay:
+            prompt = f"Jawab dalam Bahasa Malaysia: {request.prompt}"
+            summary_prompt = "Ringkaskan penerangan gambar-gambar berikut dalam Bahasa Malaysia:"
+        else:
+            prompt = f"Please respond in English: {request.prompt}"
+            summary_prompt = "Summarize the following descriptions of a series of images in English:"
+        
+        result = await cancel_on_disconnect(http_request, model_service.analyze_images(
+            prompt=prompt,
+            images=[images[index] for index in unique],
+            summary_prompt=summary_prompt if request.summarize else None
+        ))
+        
+        answers = dict(zip(unique, result["answers"]))
+        results = [
+            VLMBatchItem(
+                index=index,
+                response=answers[index if original is None else original],
+                duplicate_of=original
+            )
+            for index, original in enumerate(duplicate_of)
+        ]
+        
+        duration = time.time() - start_time
+        monitor.end_request(duration, True)
+        
+        return VLMBatchResponse(
+            results=results,
+            summary=result["summary"],
+            analyzed=len(unique),
+            skipped_duplicates=len(images) - len(unique),
+            truncated=truncated,
+            timestamp=datetime.now()
+        )
+        
+    except asyncio.TimeoutError:
+        duration = time.time() - start_time
+        monitor.end_request(duration, False)
+        logger.error("VLM batch request timeout")
+        raise HTTPException(status_code=408, detail="VLM request timeout")
+    except ClientDisconnected:
+        duration = time.time() - start_time
+        monitor.end_request(duration, False)
+        logger.info("VLM batch request abandoned by client")
+        raise HTTPException(status_code=499, detail="Client closed request")
+    except Exception as e:
+        duration = time.time() - start_time
+        monitor.end_request(duration, False)
+        logger.error(f"VLM batch error: {e}")
+        raise HTTPException(status_code=500, detail=f"VLM processing failed: {str(e)}")
+
+_whisper_languages: Dict[str, Any] = {}
+
+async def normalize_whisper_options(language: Optional[str], profile: Optional[str]) -> Optional[str]:
+    """Validate a Whisper language hint and profile; returns the hint as a Whisper language code"""
+    if profile is not None and profile not in WHISPER_PROFILES:
+        raise HTTPException(status_code=400, detail=f"Unknown profile, expected one of {sorted(WHISPER_PROFILES)}")
+    if language is not None and language != "auto":
+        if not _whisper_languages:
+            # Whisper's tables live with the model, fetched once per worker
+            _whisper_languages.update(await model_service.whisper_languages())
+        language = language.lower()
+        language = _whisper_languages["aliases"].get(language, language)
+        if language not in _whisper_languages["codes"]:
+            raise HTTPException(status_code=400, detail=f"Unsupported language: {language}")
+    return language
+
 # Optimized Whisper endpoint with load balancing
 @app.post("/api/whisper", response_model=WhisperResponse)
-async def whisper_transcribe(audio: UploadFile = File(...)):
-    """Transcribe audio using Whisper with load balancing"""
+async def whisper_transcribe(
+    http_request: Request,
+    audio: UploadFile = File(...),
+    user_name: str = Form("User"),
+    language: Optional[str] = Form(None),
+    profile: Optional[str] = Form(None),
+    x_session_id: Optional[str] = Header(None)
+):
+    """Transcribe audio using Whisper with load balancing.
+
+    ``language`` is a hint such as "ms", "en", "malay" or "auto" (defaults to
+    the language last detected for the X-Session-Id, if any, else detection);
+    ``profile`` is "fast" or "accurate".
+    """
+    language = await normalize_whisper_options(language, profile)
+    await enforce_rate_limit("whisper", x_session_id, user_name)
     start_time = time.time()
     monitor.start_request()
     request_stats["whisper_requests"] += 1
     
     try:
-        # Save uploaded audio to temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_file:
-            content = await audio.read()
-            tmp_file.write(content)
-            tmp_file.flush()
-            
-            # Find worker with smallest queue
-            best_worker = min(whisper_worker_pool, key=lambda w: w.queue.qsize())
+        content = await audio.read()
+        
+        try:
+            result = await cancel_on_disconnect(http_request, model_service.transcribe(
+                audio=content,
+                language=language,
+                profile=profile,
+                session=x_session_id
+            ))
             
-            try:
-                result = await best_worker.add_task(tmp_file.name)
-                os.unlink(tmp_file.name)
-                
-                if result["success"]:
-                    duration = time.time() - start_time
-                    monitor.end_request(duration, True)
-                    
-                    return WhisperResponse(
-                        text=result["text"],
-                        duration=result["duration"],
-                        timestamp=datetime.now()
-                    )
-                else:
-                    raise HTTPException(status_code=500, detail=result["error"])
-                    
-            except asyncio.TimeoutError:
-                os.unlink(tmp_file.name)
+            if result["success"]:
                 duration = time.time() - start_time
-                monitor.end_request(duration, False)
-                raise HTTPException(status_code=408, detail="Whisper processing timeout")
+                monitor.end_request(duration, True)
+                
+                return WhisperResponse(
+                    text=result["text"],
+                    duration=result["duration"],
+                    language=result["language"],
+                    profile=result["profile"],
+                    decode_time=result["decode_time"],
+                    timestamp=datetime.now()
+                )
+            else:
+                raise HTTPException(status_code=500, detail=result["error"])
+                
+        except asyncio.TimeoutError:
+            duration = time.time() - start_time
+            monitor.end_request(duration, False)
+            raise HTTPException(status_code=408, detail="Whisper processing timeout")
                 
+    except ClientDisconnected:
+        duration = time.time() - start_time
+        monitor.end_request(duration, False)
+        logger.info("Whisper request abandoned by client")
+        raise HTTPException(status_code=499, detail="Client closed request")
     except Exception as e:
         duration = time.time() - start_time
         monitor.end_request(duration, False)
@@ -756,18 +1738,19 @@ async def whisper_transcribe(audio: UploadFile = File(...)):
 
 # Optimized TTS endpoint with load balancing
 @app.post("/api/tts", response_model=TTSResponse)
-async def tts_generate(request: TTSRequest):
+async def tts_generate(request: TTSRequest, http_request: Request, x_session_id: Optional[str] = Header(None)):
     """Generate speech using TTS with load balancing"""
+    await enforce_rate_limit("tts", x_session_id, request.user_name)
     start_time = time.time()
     monitor.start_request()
     request_stats["tts_requests"] += 1
     
     try:
-        # Find worker with smallest queue
-        best_worker = min(tts_worker_pool, key=lambda w: w.queue.qsize())
-        
         try:
-            result = await best_worker.add_task(request.text, request.voice, request.speed)
+            result = await cancel_on_disconnect(
+                http_request,
+                model_service.synthesize(text=request.text, voice=request.voice, speed=request.speed)
+            )
             
             if result["success"]:
                 duration = time.time() - start_time
@@ -785,12 +1768,69 @@ async def tts_generate(request: TTSRequest):
             monitor.end_request(duration, False)
             raise HTTPException(status_code=408, detail="TTS processing timeout")
             
+    except ClientDisconnected:
+        duration = time.time() - start_time
+        monitor.end_request(duration, False)
+        logger.info("TTS request abandoned by client")
+        raise HTTPException(status_code=499, detail="Client closed request")
     except Exception as e:
         duration = time.time() - start_time
         monitor.end_request(duration, False)
         logger.error(f"TTS error: {e}")
         raise HTTPException(status_code=500, detail=f"TTS processing failed: {str(e)}")
 
+# Voice assistant endpoint: Whisper -> LLM -> TTS in one streamed request
+@app.post("/api/voice")
+async def voice_assistant(
+    audio: UploadFile = File(...),
+    user_name: str = Form("User"),
+    language: Optional[str] = Form(None),
+    profile: Optional[str] = Form(None),
+    voice: str = Form("default"),
+    speed: float = Form(1.0),
+    x_session_id: Optional[str] = Header(None)
+):
+    """Answer a spoken question with speech, streaming NDJSON events as they are produced.
+
+    The LLM starts as soon as the transcript is ready and each reply sentence
+    is synthesized while the rest is still being generated, so the first
+    "audio" event arrives long before the full answer exists. Event types are
+    described in ModelService.voice_pipeline.
+    """
+    language = await normalize_whisper_options(language, profile)
+    await enforce_rate_limit("voice", x_session_id, user_name)
+    request_stats["voice_requests"] += 1
+    content = await audio.read()
+    
+    async def stream_events():
+        start_time = time.time()
+        monitor.start_request()
+        failed = False
+        try:
+            pipeline = model_service.voice_pipeline(
+                audio=content,
+                language=language,
+                profile=profile,
+                session=x_session_id,
+                voice=voice,
+                speed=speed
+            )
+            async with aclosing(pipeline):
+                async for event in pipeline:
+                    failed = failed or event["type"] == "error"
+                    yield json.dumps(event) + "\n"
+        except asyncio.TimeoutError:
+            failed = True
+            yield json.dumps({"type": "error", "stage": "whisper", "error": "Whisper processing timeout"}) + "\n"
+        except Exception as e:
+            failed = True
+            logger.error(f"Voice pipeline error: {e}")
+            yield json.dumps({"type": "error", "error": f"Voice pipeline failed: {str(e)}"}) + "\n"
+        finally:
+            monitor.end_request(time.time() - start_time, not failed)
+    
+    return StreamingResponse(stream_events(), media_type="application/x-ndjson", headers=STREAM_HEADERS)
+
 # TTS voices endpoint
 @app.get("/api/tts/voices")
 async def get_tts_voices():
@@ -833,16 +1873,12 @@ async def get_tts_voices():
 @app.get("/api/status")
 async def get_status():
     """Get system status with performance metrics"""
-    stats = monitor.get_stats()
+    totals = await request_totals()
+    stats = performance_stats(totals, await system_snapshot())
     return {
-        "whisper_workers": len(whisper_worker_pool),
-        "tts_workers": len(tts_worker_pool),
-        "whisper_queue_sizes": [w.queue.qsize() for w in whisper_worker_pool],
-        "tts_queue_sizes": [w.queue.qsize() for w in tts_worker_pool],
-        "gpu_0_available": torch.cuda.is_available(),
-        "gpu_1_available": torch.cuda.is_available() and torch.cuda.device_count() > 1,
+        **await model_service.status(),
         "performance": stats,
-        "request_stats": request_stats,
+        "request_stats": totals["request_stats"],
         "timestamp": datetime.now()
     }
 
@@ -850,17 +1886,81 @@ async def get_status():
 @app.get("/api/performance")
 async def get_performance():
     """Get detailed performance metrics"""
+    system = await system_snapshot()
+    status = await model_service.status()
+    totals = await request_totals()
     return {
-        "stats": monitor.get_stats(),
-        "request_stats": request_stats,
+        "stats": performance_stats(totals, system),
+        "request_stats": totals["request_stats"],
+        **{key: status[key] for key in ("concurrency", "cancellations")},
         "config": CONFIG,
         "system": {
-            "cpu_percent": psutil.cpu_percent(),
-            "memory_percent": psutil.virtual_memory().percent,
-            "disk_usage": psutil.disk_usage('/').percent
+            "cpu_percent": system.get("cpu_percent"),
+            "memory_percent": system.get("memory_percent"),
+            "disk_usage": system.get("disk_percent"),
+            "sampled_at": system.get("timestamp")
         }
     }
 
+# Stats history endpoint
+@app.get("/api/performance/history")
+async def get_performance_history(resolution: str = "1s", limit: Optional[int] = None):
+    """Sampled CPU, memory, GPU memory and queue depths at 1s, 1m or 1h resolution"""
+    if resolution not in SystemStatsSampler.RESOLUTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown resolution, expected one of {list(SystemStatsSampler.RESOLUTIONS)}"
+        )
+    return await model_service.stats_history(resolution=resolution, limit=limit)
+
+# Capacity admin endpoints
+@app.get("/api/admin/capacity", dependencies=[Depends(require_admin)])
+async def get_capacity():
+    """Worker pool sizes, GPU concurrency limits and the log of past changes"""
+    return await model_service.capacity()
+
+@app.put("/api/admin/capacity", dependencies=[Depends(require_admin)])
+async def update_capacity(update: CapacityUpdate, x_forwarded_for: Optional[str] = Header(None)):
+    """Resize worker pools and GPU limits live; in-flight and queued work is kept"""
+    changes = update.model_dump(exclude_none=True, exclude={"note"})
+    if not changes:
+        raise HTTPException(status_code=400, detail="Nothing to change")
+    changed_by = " ".join(part for part in (x_forwarded_for or "admin", update.note) if part)
+    for key in ("ollama_concurrency_bounds", "whisper_concurrency_bounds"):
+        bounds = changes.get(key)
+        if bounds and not 1 <= bounds[0] <= bounds[1]:
+            raise HTTPException(status_code=400, detail=f"{key} must be [min, max] with 1 <= min <= max")
+    try:
+        return await model_service.resize(changed_by=changed_by, **changes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Rate limit admin endpoints
+@app.get("/api/admin/rate-limits", dependencies=[Depends(require_admin)])
+async def get_rate_limits():
+    """Current per-session rate limits and rejection counts"""
+    return (await model_service.status())["rate_limits"]
+
+@app.put("/api/admin/rate-limits", dependencies=[Depends(require_admin)])
+async def update_rate_limits(update: RateLimitUpdate):
+    """Adjust per-session rate limits without a restart"""
+    changes = update.model_dump(exclude_none=True)
+    try:
+        result = await model_service.configure_rate_limits(**changes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    logger.info(f"Rate limits updated: {changes}")
+    return result
+
+# Event-loop lag endpoint
+@app.get("/api/admin/loop", dependencies=[Depends(require_admin)])
+async def get_loop_lag(top: int = 10):
+    """Event-loop lag percentiles and the callbacks that blocked the loop the longest"""
+    result = {"api_worker": {"pid": os.getpid(), **loop_monitor.stats(top)}}
+    if isinstance(model_service, RemoteModelService):
+        result["model_server"] = await model_service.loop_stats()
+    return result
+
 # Certificate PDF endpoint
 @app.get("/api/certificate/pdf")
 async def generate_certificate_pdf_endpoint(name: str, date: str, certificate_id: str):
@@ -897,13 +1997,38 @@ async def generate_certificate_pdf_endpoint(name: str, date: str, certificate_id
         raise HTTPException(status_code=500, detail=f"Certificate generation failed: {str(e)}")
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "main:app",
-        host="0.0.0.0",
-        port=8002,
-        reload=False,
-        workers=1,  # Keep single worker for GPU management
-        log_level="info",
-        access_log=False,  # Disable access logs for performance
-        loop="asyncio"
-    )
\ No newline at end of file
+    model_server = None
+    api_workers = CONFIG["api_workers"]
+    
+    if api_workers > 1:
+        # Stateless HTTP workers in front of one process that owns the GPUs.
+        # A model server that dies is restarted; one that keeps dying stops the
+        # whole backend (SIGTERM to uvicorn) so that supervisord restarts it.
+        os.environ["USE_MODEL_SERVER"] = "1"
+        model_server = ProcessSupervisor(
+            run_model_server,
+            args=(CONFIG["model_server_socket"],),
+            name="model-server",
+            max_restarts=CONFIG["model_server_max_restarts"],
+            window=CONFIG["model_server_restart_window"],
+            on_give_up=lambda: os.kill(os.getpid(), signal.SIGTERM)
+        )
+        model_server.start()
+        logger.info(f"Model server supervised with {api_workers} API workers")
+    
+    try:
+        uvicorn.run(
+            "main:app",
+            host="0.0.0.0",
+            port=8002,
+            reload=False,
+            workers=api_workers,
+            log_level="info",
+            access_log=False,  # Disable access logs for performance
+            loop="asyncio"
+        )
+    finally:
+        if model_server is not None:
+            model_server.stop()
+            if model_server.gave_up:
+                raise SystemExit("Model server kept crashing")
@@ -0,0 +1,131 @@
+"""
+Image and video helpers for the VLM batch endpoint: frame sampling and
+near-duplicate detection with a perceptual (difference) hash.
+"""
+
+import io
+import os
+import tempfile
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import cv2
+from PIL import Image
+
+
+def dhash(image_bytes: bytes, size: int = 8) -> int:
+    """64-bit difference hash: which neighbouring pixels get brighter in a tiny grayscale copy"""
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        small = image.convert("L").resize((size + 1, size), Image.LANCZOS)
+        pixels = list(small.getdata())
+
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class DuplicateFinder:
+    """Incremental near-duplicate detection: compares each image with the unique ones seen so far"""
+
+    def __init__(self, max_distance: int):
+        self.max_distance = max_distance
+        self.kept: List[Tuple[int, int]] = []  # (index, hash) of images that will be analyzed
+
+    @property
+    def unique(self) -> int:
+        return len(self.kept)
+
+    def find(self, image_hash: int) -> Optional[int]:
+        """Index of a kept near-identical image, or None if this one is new"""
+        return next((kept_index for kept_index, kept_hash in self.kept
+                     if hamming(image_hash, kept_hash) <= self.max_distance), None)
+
+    def keep(self, index: int, image_hash: int):
+        self.kept.append((index, image_hash))
+
+
+def dedupe_images(images: List[bytes], max_distance: int) -> List[Optional[int]]:
+    """For each image, the index of an earlier near-identical image, or None if it is new"""
+    finder = DuplicateFinder(max_distance)
+    duplicate_of: List[Optional[int]] = []
+    for index, image in enumerate(images):
+        image_hash = dhash(image)
+        match = finder.find(image_hash)
+        duplicate_of.append(match)
+        if match is None:
+            finder.keep(index, image_hash)
+    return duplicate_of
+
+
+def collect_distinct_images(images: Iterable[bytes], frames: Iterable[bytes], max_distance: int,
+                            max_unique: int, max_frames: int) -> Tuple[List[Optional[bytes]], List[Optional[int]], bool]:
+    """Deduplicate uploaded images and then video frames as they are sampled.
+
+    Only distinct images count towards ``max_unique``, so a long but static
+    video is still covered to the end; at most ``max_frames`` frames are
+    sampled. Returns the images (None for duplicates, whose bytes are not
+    kept), the index of the image each one duplicates, and whether the video
+    was cut short by either limit.
+    """
+    finder = DuplicateFinder(max_distance)
+    kept: List[Optional[bytes]] = []
+    duplicate_of: List[Optional[int]] = []
+
+    def add(image: bytes) -> bool:
+        """False, without adding it, if the image is new but there is no room for it"""
+        image_hash = dhash(image)
+        original = finder.find(image_hash)
+        if original is None:
+            if finder.unique >= max_unique:
+                return False
+            finder.keep(len(kept), image_hash)
+        kept.append(image if original is None else None)
+        duplicate_of.append(original)
+        return True
+
+    truncated = False
+    for image in images:
+        if not add(image):
+            truncated = True
+    for sampled, frame in enumerate(frames):
+        if sampled >= max_frames or not add(frame):
+            truncated = True
+            break
+    return kept, duplicate_of, truncated
+
+
+def iter_video_frames(video_bytes: bytes, interval: float) -> Iterator[bytes]:
+    """JPEG frames taken every `interval` seconds, from the start to the end of the video"""
+    with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as tmp_file:
+        tmp_file.write(video_bytes)
+
+    capture = cv2.VideoCapture(tmp_file.name)
+    try:
+        if not capture.isOpened():
+            raise ValueError("Could not decode video")
+        fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+        step = max(1, round(fps * interval))
+
+        index = 0
+        while True:
+            # grab() skips decoding frames we do not keep
+            if not capture.grab():
+                break
+            if index % step == 0:
+                ok, frame = capture.retrieve()
+                if not ok:
+                    break
+                ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 90])
+                if ok:
+                    yield jpeg.tobytes()
+            index += 1
+    finally:
+        capture.release()
+        os.unlink(tmp_file.name)
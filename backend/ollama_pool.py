@@ -0,0 +1,291 @@
+"""
+Pool of Ollama hosts.
+
+Requests go to the healthy host with the fewest outstanding requests,
+preferring hosts that already have the model loaded in memory. A background
+task polls every host's /api/tags and /api/ps to track health and which
+models it has. When no host is healthy, requests still go to the hosts that
+are marked down rather than failing outright, so one transient error on a
+single-host setup does not fail everything until the next health check. Chat requests can be hedged: if the chosen host has not
+answered within a multiple of its usual latency, the same request is sent
+to a second host and whichever answers first wins. Usual latency is tracked
+per host and per model, so text chat is not judged by LLaVA's pace.
+Streaming chat is not hedged, and its (much longer) full-reply times are
+not part of that latency.
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+class OllamaHostError(Exception):
+    """Raised when no host can serve a request, or a host returns an error.
+
+    ``status_code`` is the host's HTTP status when it answered with one.
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class OllamaHost:
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.healthy = True
+        self.outstanding = 0
+        self.models: Set[str] = set()  # Pulled on the host
+        self.loaded: Set[str] = set()  # Currently in (GPU) memory
+        self.latency: Dict[str, float] = {}  # EWMA of successful non-streaming chat latency, per model
+        self.requests = 0
+        self.failures = 0
+        self.hedges_won = 0
+        self.last_error: Optional[str] = None
+
+    def has_model(self, model: str, names: Set[str]) -> bool:
+        # Ollama reports "llava:latest" for a model requested as "llava"
+        return model in names or f"{model}:latest" in names
+
+    def record(self, model: str, latency: float, alpha: float = 0.2):
+        previous = self.latency.get(model)
+        self.latency[model] = latency if previous is None else (1 - alpha) * previous + alpha * latency
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "models": sorted(self.models),
+            "loaded": sorted(self.loaded),
+            "latency": dict(self.latency),
+            "requests": self.requests,
+            "failures": self.failures,
+            "hedges_won": self.hedges_won,
+            "last_error": self.last_error,
+        }
+
+
+class OllamaPool:
+    def __init__(self, urls: Iterable[str], health_interval: float = 10.0, request_timeout: float = 300.0,
+                 hedge_multiplier: float = 2.0, hedge_min_delay: float = 0.5):
+        self.hosts = [OllamaHost(url) for url in urls]
+        if not self.hosts:
+            raise ValueError("At least one Ollama host is required")
+        self.health_interval = health_interval
+        self.request_timeout = request_timeout
+        self.hedge_multiplier = hedge_multiplier
+        self.hedge_min_delay = hedge_min_delay
+        self.hedged_requests = 0
+        self.client: Optional[httpx.AsyncClient] = None
+        self._health_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self.client = httpx.AsyncClient(timeout=self.request_timeout)
+        await self.check_all()
+        self._health_task = asyncio.create_task(self._health_loop())
+
+    async def stop(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+        if self.client is not None:
+            await self.client.aclose()
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await self.check_all()
+
+    async def check_all(self):
+        await asyncio.gather(*(self.check_health(host) for host in self.hosts))
+
+    async def check_health(self, host: OllamaHost):
+        try:
+            tags = await self.client.get(f"{host.url}/api/tags", timeout=5.0)
+            tags.raise_for_status()
+            host.models = {model["name"] for model in tags.json().get("models", [])}
+            # /api/ps only exists on newer Ollama versions
+            ps = await self.client.get(f"{host.url}/api/ps", timeout=5.0)
+            host.loaded = {model["name"] for model in ps.json().get("models", [])} if ps.status_code == 200 else set()
+            if not host.healthy:
+                logger.info(f"Ollama host {host.url} is healthy again")
+            host.healthy = True
+        except Exception as e:
+            if host.healthy:
+                logger.warning(f"Ollama host {host.url} failed health check: {e}")
+            host.healthy = False
+            host.last_error = str(e)
+
+    def pick(self, model: str, exclude: Iterable[OllamaHost] = (), fallback: bool = True) -> Optional[OllamaHost]:
+        """Least-outstanding healthy host that has the model, preferring ones with it loaded.
+
+        With ``fallback``, hosts marked unhealthy are tried when no host is healthy.
+        """
+        available = [host for host in self.hosts if host not in exclude]
+        candidates = [host for host in available if host.healthy]
+        if not candidates and fallback:
+            candidates = available
+        with_model = [host for host in candidates if host.has_model(model, host.models)]
+        if with_model:
+            candidates = with_model
+        if not candidates:
+            return None
+        return min(candidates, key=lambda host: (
+            host.outstanding,
+            not host.has_model(model, host.loaded),
+            host.latency.get(model, 0.0),
+        ))
+
+    async def _chat_on(self, host: OllamaHost, model: str, body: bytes) -> Dict[str, Any]:
+        host.outstanding += 1
+        host.requests += 1
+        start_time = time.monotonic()
+        try:
+            response = await self.client.post(f"{host.url}/api/chat", content=body, headers=JSON_HEADERS)
+            if response.status_code != 200:
+                raise OllamaHostError(f"{host.url} returned {response.status_code}: {response.text[:200]}",
+                                      response.status_code)
+            host.record(model, time.monotonic() - start_time)
+            host.loaded.add(model)
+            host.healthy = True
+            return response.json()
+        except asyncio.CancelledError:
+            raise
+        except httpx.TransportError as e:
+            # Connection-level failure: stop routing here until the next health check passes
+            host.failures += 1
+            host.healthy = False
+            host.last_error = str(e)
+            raise OllamaHostError(f"{host.url} unreachable: {e}") from e
+        except Exception as e:
+            host.failures += 1
+            host.last_error = str(e)
+            raise
+        finally:
+            host.outstanding -= 1
+
+    def _hedge_delay(self, host: OllamaHost, model: str) -> float:
+        latency = host.latency.get(model)
+        if latency is None:
+            return max(self.hedge_min_delay, self.request_timeout / 4)
+        return max(self.hedge_min_delay, latency * self.hedge_multiplier)
+
+    async def chat(self, model: str, messages: List[Dict[str, Any]], hedge: bool = False) -> Dict[str, Any]:
+        """Non-streaming /api/chat on the best host; returns Ollama's response JSON"""
+        body = await _request_body(model, messages, stream=False)
+        primary = self.pick(model)
+        if primary is None:
+            raise OllamaHostError(f"No Ollama host for {model}")
+        if not hedge:
+            return await self._chat_on(primary, model, body)
+
+        first = asyncio.create_task(self._chat_on(primary, model, body))
+        tasks = {first: primary}
+        try:
+            done, _ = await asyncio.wait({first}, timeout=self._hedge_delay(primary, model))
+            if not done:
+                # A hedge is only worth sending to a host that is known to be up
+                backup = self.pick(model, exclude=[primary], fallback=False)
+                if backup is not None:
+                    self.hedged_requests += 1
+                    logger.info(f"Hedging {model} request from {primary.url} to {backup.url}")
+                    tasks[asyncio.create_task(self._chat_on(backup, model, body))] = backup
+
+            # First successful answer wins; fail only if every attempt failed
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            tasks[task].hedges_won += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def chat_stream(self, model: str, messages: List[Dict[str, Any]]) -> AsyncIterator[str]:
+        """Streaming /api/chat on the best host, yielding reply text as it is generated.
+
+        Closing the generator early closes the connection, which stops Ollama generating.
+        """
+        body = await _request_body(model, messages, stream=True)
+        host = self.pick(model)
+        if host is None:
+            raise OllamaHostError(f"No Ollama host for {model}")
+
+        host.outstanding += 1
+        host.requests += 1
+        try:
+            async with self.client.stream("POST", f"{host.url}/api/chat", content=body, headers=JSON_HEADERS) as response:
+                if response.status_code != 200:
+                    detail = (await response.aread()).decode(errors="replace")
+                    raise OllamaHostError(f"{host.url} returned {response.status_code}: {detail[:200]}",
+                                          response.status_code)
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise OllamaHostError(f"{host.url}: {chunk['error']}")
+                    content = chunk.get("message", {}).get("content")
+                    if content:
+                        yield content
+                    if chunk.get("done"):
+                        break
+            host.loaded.add(model)
+        except (asyncio.CancelledError, GeneratorExit):
+            raise
+        except httpx.TransportError as e:
+            host.failures += 1
+            host.healthy = False
+            host.last_error = str(e)
+            raise OllamaHostError(f"{host.url} unreachable: {e}") from e
+        except Exception as e:
+            host.failures += 1
+            host.last_error = str(e)
+            raise
+        finally:
+            host.outstanding -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hosts": [host.stats() for host in self.hosts],
+            "hedged_requests": self.hedged_requests,
+        }
+
+
+async def _request_body(model: str, messages: List[Dict[str, Any]], stream: bool) -> bytes:
+    """/api/chat request body. With images it is megabytes of base64 and JSON, built in a
+    thread so the event loop (which serves every API worker's calls) keeps going"""
+    if any(message.get("images") for message in messages):
+        return await asyncio.to_thread(_encode_body, model, messages, stream)
+    return _encode_body(model, messages, stream)
+
+
+def _encode_body(model: str, messages: List[Dict[str, Any]], stream: bool) -> bytes:
+    payload = {"model": model, "messages": [_encode_images(message) for message in messages], "stream": stream}
+    return json.dumps(payload).encode()
+
+
+def _encode_images(message: Dict[str, Any]) -> Dict[str, Any]:
+    """The REST API takes images as base64 strings"""
+    if not message.get("images"):
+        return message
+    images = [
+        base64.b64encode(image).decode() if isinstance(image, (bytes, bytearray)) else image
+        for image in message["images"]
+    ]
+    return {**message, "images": images}
@@ -0,0 +1,98 @@
+"""
+Per-session token-bucket rate limiting.
+
+Every session (kiosk) gets its own bucket that refills at a steady rate up to
+a burst capacity. Requests spend tokens according to their cost, so one VLM
+call drains a bucket faster than one chat message.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, now: float):
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, capacity: float, refill_rate: float, now: float):
+        self.tokens = min(capacity, self.tokens + (now - self.updated) * refill_rate)
+        self.updated = now
+
+
+class RateLimiter:
+    def __init__(self, capacity: float, refill_rate: float, costs: Dict[str, float],
+                 max_sessions: int = 10000):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.costs = dict(costs)
+        self.max_sessions = max_sessions
+        self.enabled = True
+        self.buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.rejected: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def cost_of(self, endpoint: str, units: int = 1) -> float:
+        return self.costs.get(endpoint, 1.0) * units
+
+    def take(self, key: str, endpoint: str, units: int = 1) -> float:
+        """Spend tokens for a request. Returns 0 when admitted, otherwise seconds until it would be"""
+        if not self.enabled:
+            return 0.0
+
+        cost = self.cost_of(endpoint, units)
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = TokenBucket(self.capacity, now)
+                # A bucket untouched long enough is full again, so forgetting the
+                # least recently used one is the same as keeping it
+                if len(self.buckets) > self.max_sessions:
+                    self.buckets.popitem(last=False)
+            else:
+                self.buckets.move_to_end(key)
+                bucket.refill(self.capacity, self.refill_rate, now)
+
+            # A request costing more than a full bucket (a big batch) is admitted
+            # once the bucket is full and leaves it in debt, so it is never stuck
+            needed = min(cost, self.capacity)
+            if bucket.tokens >= needed:
+                bucket.tokens -= cost
+                return 0.0
+
+            self.rejected[endpoint] = self.rejected.get(endpoint, 0) + 1
+            return (needed - bucket.tokens) / self.refill_rate
+
+    def configure(self, capacity: Optional[float] = None, refill_rate: Optional[float] = None,
+                  costs: Optional[Dict[str, float]] = None, enabled: Optional[bool] = None) -> Dict[str, Any]:
+        """Change limits at runtime; existing buckets keep their tokens, capped to the new capacity"""
+        if (capacity is not None and capacity <= 0) or (refill_rate is not None and refill_rate <= 0):
+            raise ValueError("capacity and refill_rate must be positive")
+        if costs and any(cost < 0 for cost in costs.values()):
+            raise ValueError("costs must not be negative")
+        with self.lock:
+            if capacity is not None:
+                self.capacity = capacity
+                for bucket in self.buckets.values():
+                    bucket.tokens = min(bucket.tokens, capacity)
+            if refill_rate is not None:
+                self.refill_rate = refill_rate
+            if costs:
+                self.costs.update(costs)
+            if enabled is not None:
+                self.enabled = enabled
+        return self.stats()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "enabled": self.enabled,
+                "capacity": self.capacity,
+                "refill_rate": self.refill_rate,
+                "costs": dict(self.costs),
+                "sessions": len(self.buckets),
+                "rejected": dict(self.rejected),
+            }
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Replay captured traffic (see traffic_capture.py) against a backend.
+
+Requests are sent with their original spacing divided by --speed, so a
+capture from a busy hour can be rehearsed at 1x-10x its real rate.
+Requests captured with their payload are replayed verbatim; the rest get
+synthetic payloads of the recorded size, derived from the payload hash so
+that repeated payloads (e.g. the same TTS phrase) stay repeated.
+
+Usage:
+    CAPTURE_DIR=captures python main.py            # capture on the live backend
+    python replay.py captures/*.jsonl --target http://localhost:8002 --speed 4
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import json
+import math
+import random
+import struct
+import sys
+import time
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+WORDS = (
+    "apa itu kecerdasan buatan how does a neural network learn terangkan "
+    "teknologi masa depan what is machine learning boleh anda bantu saya "
+    "describe the weather in kuala lumpur today selamat datang ke pameran "
+    "sains inovasi robot komputer data model bahasa besar untuk semua"
+).split()
+
+
+def load_capture(paths: List[str]) -> List[Dict[str, Any]]:
+    """Records from one or more capture files (one per backend process), oldest first"""
+    records = []
+    for path in paths:
+        with open(path) as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    records.sort(key=lambda record: record["t"])
+    return records
+
+
+@lru_cache(maxsize=1024)
+def synthetic_text(seed: str, length: int) -> str:
+    rng = random.Random(seed)
+    words: List[str] = []
+    size = 0
+    while size < length:
+        word = rng.choice(WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)[:max(1, length)]
+
+
+@lru_cache(maxsize=64)
+def synthetic_jpeg(seed: str, size: int) -> bytes:
+    """Noise JPEG of roughly `size` bytes (noise barely compresses, ~1.5 bytes per pixel)"""
+    from PIL import Image
+
+    side = max(32, min(2048, int(math.sqrt(size / 1.5))))
+    noise = Image.effect_noise((side, side), 40 + random.Random(seed).randint(0, 40))
+    buffer = io.BytesIO()
+    noise.convert("RGB").save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=64)
+def synthetic_wav(seed: str, size: int) -> bytes:
+    """16 kHz mono 16-bit WAV of `size` bytes: a few mixed tones"""
+    rate = 16000
+    samples = max(rate // 10, (size - 44) // 2)
+    rng = random.Random(seed)
+    tones = [rng.uniform(150, 900) for _ in range(3)]
+    step = [2 * math.pi * tone / rate for tone in tones]
+    frames = struct.pack(
+        f"<{samples}h",
+        *(int(3000 * sum(math.sin(s * i) for s in step)) for i in range(samples))
+    )
+    header = struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + len(frames), b"WAVE", b"fmt ", 16, 1, 1, rate, rate * 2, 2, 16, b"data", len(frames),
+    )
+    return header + frames
+
+
+def build_request(record: Dict[str, Any]) -> Dict[str, Any]:
+    """httpx.request() arguments reproducing one captured request"""
+    method, path = record["method"], record["path"]
+    request: Dict[str, Any] = {"method": method, "url": path, "headers": {}}
+    if record.get("session"):
+        request["headers"]["X-Session-Id"] = record["session"]
+
+    if "payload" in record:
+        request["content"] = base64.b64decode(record["payload"])
+        if record.get("content_type"):
+            request["headers"]["Content-Type"] = record["content_type"]
+        if record.get("query"):
+            request["url"] = f"{path}?{record['query']}"
+        return request
+
+    seed = record.get("payload_hash") or path
+    size = record.get("request_bytes", 0)
+    if path == "/api/llm":
+        request["json"] = {"message": synthetic_text(seed, size - 40), "user_name": "Replay"}
+    elif path == "/api/llm/batch":
+        count = max(1, min(100, size // 120))
+        request["json"] = {"prompts": [synthetic_text(f"{seed}{i}", 100) for i in range(count)], "user_name": "Replay"}
+    elif path == "/api/vlm":
+        image = synthetic_jpeg(seed, size * 3 // 4)
+        request["json"] = {"prompt": "Describe this image", "image_base64": base64.b64encode(image).decode(),
+                           "user_name": "Replay"}
+    elif path == "/api/vlm/batch":
+        count = max(1, min(16, round(size / 200_000)))
+        images = [synthetic_jpeg(f"{seed}{i}", size * 3 // 4 // count) for i in range(count)]
+        request["json"] = {"prompt": "Describe these images", "user_name": "Replay",
+                           "images_base64": [base64.b64encode(image).decode() for image in images]}
+    elif path in ("/api/whisper", "/api/voice"):
+        request["files"] = {"audio": ("replay.wav", synthetic_wav(seed, max(0, size - 400)), "audio/wav")}
+        request["data"] = {"user_name": "Replay"}
+    elif path == "/api/tts":
+        request["json"] = {"text": synthetic_text(seed, size - 70), "user_name": "Replay"}
+    elif path == "/api/certificate/pdf":
+        request["params"] = {"name": "Replay Visitor", "date": "1 January 2025", "certificate_id": seed[:8]}
+    return request
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, math.ceil(fraction * len(values)) - 1))]
+
+
+async def replay(records: List[Dict[str, Any]], target: str, speed: float = 1.0,
+                 timeout: float = 300.0) -> Dict[str, Any]:
+    requests = [build_request(record) for record in records]
+    results: Dict[str, Dict[str, list]] = defaultdict(lambda: {"latency": [], "captured": [], "errors": []})
+    start_lag: List[float] = []
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+    async with httpx.AsyncClient(base_url=target, timeout=timeout, limits=limits) as client:
+        async def send(record: Dict[str, Any], request: Dict[str, Any], due: float):
+            await asyncio.sleep(max(0.0, due - time.monotonic()))
+            # How far behind schedule we are; large values mean the replayer itself is the bottleneck
+            start_lag.append(time.monotonic() - due)
+            endpoint = results[f"{record['method']} {record['path']}"]
+            endpoint["captured"].append(record["duration"])
+            started = time.monotonic()
+            try:
+                response = await client.request(**request)
+                if response.status_code >= 400:
+                    endpoint["errors"].append(response.status_code)
+                    return
+                endpoint["latency"].append(time.monotonic() - started)
+            except httpx.HTTPError as e:
+                endpoint["errors"].append(type(e).__name__)
+
+        began = time.monotonic()
+        first = records[0]["t"] if records else 0.0
+        await asyncio.gather(*(
+            send(record, request, began + (record["t"] - first) / speed)
+            for record, request in zip(records, requests)
+        ))
+        elapsed = time.monotonic() - began
+
+    report = {"requests": len(records), "speed": speed, "elapsed": elapsed,
+              "max_start_lag": max(start_lag, default=0.0), "endpoints": {}}
+    for name, endpoint in sorted(results.items()):
+        latency, captured = sorted(endpoint["latency"]), sorted(endpoint["captured"])
+        errors: Dict[str, int] = defaultdict(int)
+        for error in endpoint["errors"]:
+            errors[str(error)] += 1
+        report["endpoints"][name] = {
+            "count": len(captured),
+            "ok": len(latency),
+            "errors": dict(errors),
+            "p50": percentile(latency, 0.5),
+            "p90": percentile(latency, 0.9),
+            "p99": percentile(latency, 0.99),
+            "max": latency[-1] if latency else None,
+            "captured_p50": percentile(captured, 0.5),
+            "captured_p99": percentile(captured, 0.99),
+        }
+    return report
+
+
+def print_report(report: Dict[str, Any]):
+    def ms(value: Optional[float]) -> str:
+        return "-" if value is None else f"{value * 1000:.0f}"
+
+    print(f"Replayed {report['requests']} requests at {report['speed']}x in {report['elapsed']:.1f}s "
+          f"(max start lag {report['max_start_lag'] * 1000:.0f} ms)")
+    print(f"{'endpoint':<32} {'count':>6} {'ok':>6} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8} "
+          f"{'was p50':>8} {'was p99':>8}  errors")
+    for name, stats in report["endpoints"].items():
+        errors = ", ".join(f"{error}x{count}" for error, count in stats["errors"].items())
+        print(f"{name:<32} {stats['count']:>6} {stats['ok']:>6} {ms(stats['p50']):>8} {ms(stats['p90']):>8} "
+              f"{ms(stats['p99']):>8} {ms(stats['max']):>8} {ms(stats['captured_p50']):>8} "
+              f"{ms(stats['captured_p99']):>8}  {errors}")
+    print("(latencies in ms; 'was' columns are from the capture)")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay captured traffic and report latency percentiles per endpoint")
+    parser.add_argument("captures", nargs="+", help="capture-*.jsonl files written with CAPTURE_DIR set")
+    parser.add_argument("--target", default="http://localhost:8002", help="backend base URL")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression, e.g. 4 replays an hour in 15 minutes")
+    parser.add_argument("--timeout", type=float, default=300.0, help="per-request timeout in seconds")
+    parser.add_argument("--endpoint", action="append", help="only replay these paths (repeatable)")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+
+    records = load_capture(args.captures)
+    if args.endpoint:
+        records = [record for record in records if record["path"] in args.endpoint]
+    if not records:
+        print("No requests to replay", file=sys.stderr)
+        return 1
+
+    span = records[-1]["t"] - records[0]["t"]
+    print(f"Replaying {len(records)} requests spanning {span:.0f}s against {args.target} "
+          f"(~{span / args.speed:.0f}s at {args.speed}x)")
+    report = asyncio.run(replay(records, args.target, args.speed, args.timeout))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
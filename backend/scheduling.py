@@ -0,0 +1,271 @@
+"""
+Scheduling primitives for GPU slots.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Lower value is served first
+PRIORITIES = {
+    "interactive": 0,  # A person is waiting on the answer (chat, VLM, voice)
+    "bulk": 1,  # Batch jobs such as quiz generation and grading
+}
+
+
+class PrioritySemaphore:
+    """Semaphore that hands free slots to the highest-priority waiter first.
+
+    ``class_limits`` caps how many slots one priority class may hold at once,
+    so bulk work can never occupy the slots interactive requests need.
+    """
+
+    def __init__(self, limit: int, class_limits: Optional[Dict[str, int]] = None):
+        self.limit = limit
+        self.class_limits = dict(class_limits or {})
+        self.in_use = 0
+        self.in_use_by_class: Dict[str, int] = {name: 0 for name in PRIORITIES}
+        self._waiters: List[Tuple[int, int, str, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+    def _can_take(self, priority: str) -> bool:
+        if self.in_use >= self.limit:
+            return False
+        class_limit = self.class_limits.get(priority)
+        return class_limit is None or self.in_use_by_class[priority] < class_limit
+
+    def _take(self, priority: str):
+        self.in_use += 1
+        self.in_use_by_class[priority] += 1
+
+    async def acquire(self, priority: str = "interactive"):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+
+        # Only bypass the queue when nobody of the same or higher priority is waiting
+        rank = PRIORITIES[priority]
+        if self._can_take(priority) and not any(w[0] <= rank for w in self._waiters):
+            self._take(priority)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (rank, next(self._seq), priority, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot was granted just as we were cancelled; give it back
+                self.release(priority)
+            else:
+                self._waiters = [w for w in self._waiters if w[3] is not future]
+                heapq.heapify(self._waiters)
+            raise
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def set_limit(self, limit: int):
+        """Change the number of slots; waiters are woken if it grew"""
+        self.limit = max(1, int(limit))
+        self._wake()
+
+    def release(self, priority: str = "interactive"):
+        self.in_use -= 1
+        self.in_use_by_class[priority] -= 1
+        self._wake()
+
+    def _wake(self):
+        # Walk waiters in priority order, skipping classes that are at their cap
+        skipped = []
+        while self._waiters and self.in_use < self.limit:
+            waiter = heapq.heappop(self._waiters)
+            _, _, priority, future = waiter
+            if future.done():
+                continue
+            if not self._can_take(priority):
+                skipped.append(waiter)
+                continue
+            self._take(priority)
+            future.set_result(None)
+        for waiter in skipped:
+            heapq.heappush(self._waiters, waiter)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "limit": self.limit,
+            "in_use": self.in_use,
+            "in_use_by_class": dict(self.in_use_by_class),
+            "waiting": self.waiting,
+        }
+
+
+class AdaptiveLimit:
+    """AIMD controller that tunes a PrioritySemaphore's limit from observed latency.
+
+    The baseline is the no-load latency, kept per kind of call (a text chat
+    and a LLaVA call on the same GPU differ by an order of magnitude): it is
+    measured by briefly dropping the limit to ``min_limit`` (at start and
+    every ``probe_every`` calls) and lowered by any faster call of the same
+    kind seen in between. A call that fails or takes longer than
+    ``tolerance`` times its kind's baseline means the device is overloaded: the limit is cut by ``backoff``, at most once per call
+    duration so a burst of slow calls counts once. A fast call made while
+    every slot was busy raises the limit by 1/limit, i.e. about one slot per
+    full round of calls.
+    """
+
+    def __init__(self, semaphore: PrioritySemaphore, min_limit: int, max_limit: int,
+                 tolerance: float = 2.0, backoff: float = 0.9, probe_every: int = 1000,
+                 probe_size: int = 5, enabled: bool = True):
+        self.semaphore = semaphore
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.probe_every = probe_every
+        self.probe_size = probe_size
+        self.enabled = enabled
+        self.limit = float(min(max(semaphore.limit, min_limit), max_limit))
+        self.baselines: Dict[Optional[str], float] = {}
+        self.last_decrease = 0.0
+        self.increases = 0
+        self.decreases = 0
+        self.calls_since_probe = 0
+        self.probe_samples: Optional[List[Tuple[Optional[str], float]]] = None
+        self.semaphore.set_limit(int(self.limit))
+        if enabled:
+            self._start_probe()
+
+    def _start_probe(self):
+        self.probe_samples = []
+        self.semaphore.set_limit(self.min_limit)
+
+    def _finish_probe(self):
+        # Kinds seen in the probe get a fresh baseline; the others keep theirs
+        probed: Dict[Optional[str], float] = {}
+        for kind, latency in self.probe_samples:
+            probed[kind] = min(latency, probed.get(kind, latency))
+        self.baselines.update(probed)
+        self.probe_samples = None
+        self.calls_since_probe = 0
+        self.semaphore.set_limit(int(self.limit))
+
+    def observe(self, latency: float, success: bool, saturated: bool, in_flight: int,
+                kind: Optional[str] = None):
+        """Record one finished call.
+
+        ``saturated`` means every slot was busy while it ran and ``in_flight``
+        is how many calls (including this one) held a slot when it started.
+        ``success`` is False only for failures that point at load (timeouts,
+        an unreachable or erroring server), not for bad input. ``kind`` picks
+        the baseline the latency is compared with.
+        """
+        if not self.enabled:
+            return
+
+        if self.probe_samples is not None:
+            # Only calls that started once the probe had drained the device count
+            if success and in_flight <= self.min_limit:
+                self.probe_samples.append((kind, latency))
+                if len(self.probe_samples) >= self.probe_size:
+                    self._finish_probe()
+            return
+
+        baseline = self.baselines.get(kind)
+        if success and (baseline is None or latency < baseline):
+            self.baselines[kind] = baseline = latency
+        overloaded = not success or (baseline is not None and latency > baseline * self.tolerance)
+        now = time.monotonic()
+        if overloaded:
+            if now - self.last_decrease >= latency:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self.last_decrease = now
+                self.decreases += 1
+        elif saturated:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.increases += 1
+
+        self.calls_since_probe += 1
+        if self.calls_since_probe >= self.probe_every:
+            self._start_probe()
+        elif int(self.limit) != self.semaphore.limit:
+            self.semaphore.set_limit(int(self.limit))
+
+    def configure(self, min_limit: Optional[int] = None, max_limit: Optional[int] = None,
+                  limit: Optional[int] = None, enabled: Optional[bool] = None):
+        """Change bounds or pin the limit by hand (with ``enabled=False``)"""
+        new_min = self.min_limit if min_limit is None else min_limit
+        new_max = self.max_limit if max_limit is None else max_limit
+        if new_min < 1 or new_min > new_max:
+            raise ValueError("Concurrency bounds must satisfy 1 <= min <= max")
+        self.min_limit, self.max_limit = new_min, new_max
+        if enabled is not None:
+            self.enabled = enabled
+        if limit is not None:
+            self.limit = float(limit)
+        self.limit = float(min(max(self.limit, self.min_limit), self.max_limit))
+        if not self.enabled:
+            self.probe_samples = None
+        if self.probe_samples is None:
+            self.semaphore.set_limit(int(self.limit))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "adaptive": self.enabled,
+            "limit": int(self.limit),
+            "probing": self.probe_samples is not None,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "baseline_latency": {kind or "default": latency for kind, latency in self.baselines.items()},
+            "increases": self.increases,
+            "decreases": self.decreases,
+            **{key: value for key, value in self.semaphore.stats().items() if key != "limit"},
+        }
+
+
+class CancellationStats:
+    """Work abandoned by its caller, and an estimate of the GPU time that was not spent on it.
+
+    A job dropped before it started saves a typical run of its kind (EWMA of
+    completed runs); one aborted mid-run saves the typical remainder.
+    """
+
+    def __init__(self, gpu_kinds: Optional[Tuple[str, ...]] = None, alpha: float = 0.2):
+        self.gpu_kinds = gpu_kinds  # Kinds counted in gpu_seconds_saved; None counts all
+        self.alpha = alpha
+        self.typical: Dict[str, float] = {}
+        self.kinds: Dict[str, Dict[str, float]] = {}
+
+    def _kind(self, kind: str) -> Dict[str, float]:
+        return self.kinds.setdefault(kind, {"completed": 0, "dropped": 0, "aborted": 0, "seconds_saved": 0.0})
+
+    def completed(self, kind: str, seconds: float):
+        self._kind(kind)["completed"] += 1
+        typical = self.typical.get(kind)
+        self.typical[kind] = seconds if typical is None else (1 - self.alpha) * typical + self.alpha * seconds
+
+    def dropped(self, kind: str):
+        """Abandoned while queued, never started"""
+        counts = self._kind(kind)
+        counts["dropped"] += 1
+        counts["seconds_saved"] += self.typical.get(kind, 0.0)
+
+    def aborted(self, kind: str, elapsed: float):
+        """Stopped after running for ``elapsed`` seconds"""
+        counts = self._kind(kind)
+        counts["aborted"] += 1
+        counts["seconds_saved"] += max(0.0, self.typical.get(kind, elapsed) - elapsed)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "gpu_seconds_saved": sum(
+                counts["seconds_saved"] for kind, counts in self.kinds.items()
+                if self.gpu_kinds is None or kind in self.gpu_kinds
+            ),
+            "kinds": {
+                kind: {**counts, "typical_seconds": self.typical.get(kind)}
+                for kind, counts in sorted(self.kinds.items())
+            },
+        }
@@ -0,0 +1,49 @@
+"""
+Incremental sentence splitting for streamed LLM output, so speech synthesis
+can start on the first sentence while the rest of the reply is generated.
+"""
+
+import re
+from typing import List, Optional
+
+# Sentence-ending punctuation (plus closing quotes/brackets) followed by whitespace,
+# or a line break. "3.5" and "e.g.x" do not match because no whitespace follows.
+BOUNDARY = re.compile(r"[.!?。]+[\"')\]]*\s+|\n+")
+# Where to break an overlong sentence, best first
+SOFT_BOUNDARIES = (re.compile(r"[,;:]\s+"), re.compile(r"\s+"))
+
+
+class SentenceSplitter:
+    def __init__(self, min_chars: int = 12, max_chars: int = 200):
+        self.min_chars = min_chars  # Shorter pieces ("1.", "Hi!") are joined to the next sentence
+        self.max_chars = max_chars  # Longer runs without a boundary are broken at a comma or space
+        self.buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        """Add streamed text; returns the sentences it completed"""
+        self.buffer += text
+        sentences = []
+        start = 0
+        for match in BOUNDARY.finditer(self.buffer):
+            if len(self.buffer[start:match.end()].strip()) >= self.min_chars:
+                sentences.append(self.buffer[start:match.end()].strip())
+                start = match.end()
+        self.buffer = self.buffer[start:]
+
+        while len(self.buffer) > self.max_chars:
+            cut = self._soft_break()
+            sentences.append(self.buffer[:cut].strip())
+            self.buffer = self.buffer[cut:]
+        return sentences
+
+    def _soft_break(self) -> int:
+        for pattern in SOFT_BOUNDARIES:
+            breaks = [match.end() for match in pattern.finditer(self.buffer, 0, self.max_chars)]
+            if breaks:
+                return breaks[-1]
+        return self.max_chars
+
+    def flush(self) -> Optional[str]:
+        """Whatever is left once the stream has ended"""
+        rest, self.buffer = self.buffer.strip(), ""
+        return rest or None
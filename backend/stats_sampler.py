@@ -0,0 +1,126 @@
+"""
+Background system-stats sampler.
+
+A single task samples CPU, RAM, GPU memory and queue depths at a fixed
+interval into fixed-size ring buffers, so status endpoints read the latest
+sample instead of querying psutil / CUDA on every hit. Older data is kept
+at coarser resolution: per-second samples are averaged into per-minute
+points, and those into per-hour points.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from array import array
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RingBuffer:
+    """Fixed-capacity time series of float rows stored in flat arrays"""
+
+    def __init__(self, fields: List[str], capacity: int):
+        self.fields = fields
+        self.capacity = capacity
+        self.timestamps = array("d", [math.nan] * capacity)
+        self.values = array("d", [math.nan] * (capacity * len(fields)))
+        self.next = 0
+        self.size = 0
+
+    def append(self, timestamp: float, row: List[float]):
+        width = len(self.fields)
+        self.timestamps[self.next] = timestamp
+        self.values[self.next * width:(self.next + 1) * width] = array("d", row)
+        self.next = (self.next + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def series(self, limit: Optional[int] = None) -> Dict[str, List[Optional[float]]]:
+        """Oldest-first columns, NaN (missing data) as None"""
+        count = self.size if limit is None else min(limit, self.size)
+        width = len(self.fields)
+        start = (self.next - count) % self.capacity
+        slots = [(start + i) % self.capacity for i in range(count)]
+        columns = {"timestamp": [self.timestamps[slot] for slot in slots]}
+        for offset, field in enumerate(self.fields):
+            columns[field] = [_none_if_nan(self.values[slot * width + offset]) for slot in slots]
+        return columns
+
+
+class SystemStatsSampler:
+    # name -> (seconds per point, points kept)
+    RESOLUTIONS = {
+        "1s": (1, 300),  # 5 minutes
+        "1m": (60, 180),  # 3 hours
+        "1h": (3600, 168),  # 1 week
+    }
+
+    def __init__(self, collect: Callable[[], Dict[str, float]], interval: float = 1.0):
+        self.collect = collect
+        self.interval = interval
+        self.fields: Optional[List[str]] = None
+        self.buffers: Dict[str, RingBuffer] = {}
+        self.latest: Dict[str, Any] = {}
+        self._sums: Dict[str, List[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self.sample()
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.sample()
+            except Exception as e:
+                logger.warning(f"Stats sampling failed: {e}")
+
+    def sample(self):
+        values = self.collect()
+        now = time.time()
+        if self.fields is None:
+            # The first sample fixes the columns (e.g. how many GPUs there are)
+            self.fields = list(values)
+            self.buffers = {name: RingBuffer(self.fields, points) for name, (_, points) in self.RESOLUTIONS.items()}
+        row = [float(values.get(field, math.nan)) for field in self.fields]
+        self.latest = {"timestamp": now, **values}
+
+        self.buffers["1s"].append(now, row)
+        self._roll_up("1m", now, row, 60 / self.interval)
+
+    def _roll_up(self, name: str, now: float, row: List[float], points_per_bucket: float):
+        sums = self._sums.setdefault(name, [0.0] * len(row))
+        for i, value in enumerate(row):
+            sums[i] += value
+        self._counts[name] = self._counts.get(name, 0) + 1
+        if self._counts[name] < points_per_bucket:
+            return
+
+        average = [total / self._counts[name] for total in sums]
+        self.buffers[name].append(now, average)
+        self._sums[name] = [0.0] * len(row)
+        self._counts[name] = 0
+        if name == "1m":
+            self._roll_up("1h", now, average, 60)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Most recent sample, O(1)"""
+        return dict(self.latest)
+
+    def history(self, resolution: str = "1s", limit: Optional[int] = None) -> Dict[str, Any]:
+        if resolution not in self.RESOLUTIONS:
+            raise ValueError(f"Unknown resolution {resolution}, expected one of {list(self.RESOLUTIONS)}")
+        if self.fields is None:
+            return {"resolution": resolution, "series": {}}
+        return {"resolution": resolution, "series": self.buffers[resolution].series(limit)}
+
+
+def _none_if_nan(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
@@ -0,0 +1,80 @@
+"""
+Keeps a child process running.
+
+The model server is a separate process next to the uvicorn workers, and
+supervisord only sees their common parent. If the child dies (a CUDA OOM,
+say), it is restarted here. A child that keeps dying - more than
+``max_restarts`` times within ``window`` seconds - calls ``on_give_up``
+instead, which shuts the whole backend down so supervisord restarts it and
+the failure is visible.
+"""
+
+import logging
+import multiprocessing
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ProcessSupervisor:
+    def __init__(self, target: Callable[..., Any], args: Tuple = (), name: str = "child",
+                 max_restarts: int = 3, window: float = 600.0,
+                 on_give_up: Optional[Callable[[], None]] = None):
+        self.target = target
+        self.args = args
+        self.name = name
+        self.max_restarts = max_restarts
+        self.window = window
+        self.on_give_up = on_give_up
+        self.process: Optional[multiprocessing.Process] = None
+        self.restarts = deque()
+        self.gave_up = False
+        self._stopping = False
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        # spawn (not fork) so the child never inherits CUDA state
+        self._context = multiprocessing.get_context("spawn")
+
+    def _spawn(self):
+        self.process = self._context.Process(target=self.target, args=self.args, name=self.name)
+        self.process.start()
+        logger.info(f"Started {self.name} (pid {self.process.pid})")
+
+    def start(self):
+        with self._lock:
+            self._spawn()
+        self._watcher = threading.Thread(target=self._watch, name=f"{self.name}-supervisor", daemon=True)
+        self._watcher.start()
+
+    def _watch(self):
+        while True:
+            process = self.process
+            process.join()
+            with self._lock:
+                if self._stopping:
+                    return
+                now = time.monotonic()
+                while self.restarts and now - self.restarts[0] > self.window:
+                    self.restarts.popleft()
+                if len(self.restarts) >= self.max_restarts:
+                    logger.critical(
+                        f"{self.name} exited with code {process.exitcode} after {len(self.restarts)} restarts "
+                        f"in {self.window:.0f}s, giving up"
+                    )
+                    self.gave_up = True
+                    break
+                self.restarts.append(now)
+                logger.error(f"{self.name} exited with code {process.exitcode}, restarting")
+                self._spawn()
+        if self.on_give_up is not None:
+            self.on_give_up()
+
+    def stop(self, timeout: float = 10.0):
+        with self._lock:
+            self._stopping = True
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout=timeout)
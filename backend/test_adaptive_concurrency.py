@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Simulation test for the adaptive concurrency limit (no GPU needed)
+"""
+
+import asyncio
+import random
+
+import pytest
+
+import scheduling
+from scheduling import AdaptiveLimit, PrioritySemaphore
+
+
+class FakeGPU:
+    """Runs `capacity` calls at full speed; beyond that every call slows down proportionally"""
+
+    def __init__(self, capacity: int, base_latency: float = 0.01):
+        self.capacity = capacity
+        self.base_latency = base_latency
+        self.active = 0
+
+    async def run(self):
+        self.active += 1
+        try:
+            await asyncio.sleep(self.base_latency * max(1.0, self.active / self.capacity))
+        finally:
+            self.active -= 1
+
+
+async def drive(limit: AdaptiveLimit, gpu: FakeGPU, clients: int, duration: float):
+    """Closed-loop load: each client sends its next call as soon as the previous one returns"""
+    semaphore = limit.semaphore
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+
+    async def client():
+        while loop.time() < deadline:
+            await semaphore.acquire()
+            start = loop.time()
+            in_flight = semaphore.in_use
+            saturated = in_flight >= semaphore.limit or semaphore.waiting > 0
+            try:
+                await gpu.run()
+            finally:
+                semaphore.release()
+            limit.observe(loop.time() - start, True, saturated, in_flight)
+
+    await asyncio.gather(*(client() for _ in range(clients)))
+
+
+def test_limit_backs_off_when_gpu_is_overloaded():
+    async def scenario():
+        gpu = FakeGPU(capacity=4)
+        limit = AdaptiveLimit(PrioritySemaphore(20), min_limit=1, max_limit=32, tolerance=2.0)
+        await drive(limit, gpu, clients=40, duration=2.0)
+        return limit
+
+    limit = asyncio.run(scenario())
+    print(f"Overloaded GPU (capacity 4): limit settled at {int(limit.limit)}")
+    assert limit.decreases > 0
+    # Latency doubles at 2x capacity, which is where tolerance=2.0 holds the limit
+    assert 4 <= int(limit.limit) <= 10
+
+
+def test_limit_grows_when_gpu_has_headroom():
+    async def scenario():
+        gpu = FakeGPU(capacity=12)
+        limit = AdaptiveLimit(PrioritySemaphore(2), min_limit=1, max_limit=32, tolerance=2.0)
+        await drive(limit, gpu, clients=40, duration=2.0)
+        return limit
+
+    limit = asyncio.run(scenario())
+    print(f"Idle GPU (capacity 12): limit grew from 2 to {int(limit.limit)}")
+    assert limit.increases > 0
+    assert limit.limit >= 8
+
+
+def test_limit_stays_within_bounds():
+    async def scenario():
+        gpu = FakeGPU(capacity=64)
+        limit = AdaptiveLimit(PrioritySemaphore(4), min_limit=3, max_limit=6)
+        await drive(limit, gpu, clients=40, duration=1.0)
+        return limit
+
+    limit = asyncio.run(scenario())
+    assert 3 <= limit.limit <= 6
+
+
+def test_limit_does_not_grow_without_load():
+    async def scenario():
+        gpu = FakeGPU(capacity=64)
+        limit = AdaptiveLimit(PrioritySemaphore(8), min_limit=1, max_limit=32)
+        await drive(limit, gpu, clients=2, duration=0.5)
+        return limit
+
+    limit = asyncio.run(scenario())
+    assert limit.increases == 0
+    assert limit.limit <= 8
+
+
+def test_each_kind_is_judged_by_its_own_baseline(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(scheduling.time, "monotonic", lambda: now[0])
+    limit = AdaptiveLimit(PrioritySemaphore(10), min_limit=2, max_limit=32, tolerance=3.0, enabled=False)
+    limit.configure(enabled=True)
+
+    # Unsaturated mix of fast text chat and ~10x slower LLaVA calls: no sign of overload
+    rng = random.Random(0)
+    for _ in range(500):
+        kind, latency = ("vlm", rng.uniform(3.0, 5.0)) if rng.random() < 0.3 else ("llm", rng.uniform(0.3, 0.5))
+        now[0] += latency
+        limit.observe(latency, True, saturated=False, in_flight=3, kind=kind)
+    assert limit.decreases == 0 and int(limit.limit) == 10
+    assert limit.stats()["baseline_latency"] == {"llm": pytest.approx(0.3, abs=0.01), "vlm": pytest.approx(3.0, abs=0.05)}
+
+    # A text chat taking as long as a LLaVA call does mean overload
+    now[0] += 4.0
+    limit.observe(4.0, True, saturated=True, in_flight=10, kind="llm")
+    assert limit.decreases == 1 and int(limit.limit) == 9
+
+
+def test_probe_refreshes_the_baselines_it_measured():
+    limit = AdaptiveLimit(PrioritySemaphore(8), min_limit=1, max_limit=32, probe_size=3)
+    for latency in (0.5, 0.4, 0.6):
+        limit.observe(latency, True, saturated=False, in_flight=1, kind="llm")
+    limit.observe(2.0, True, saturated=False, in_flight=1, kind="vlm")
+    assert limit.stats()["baseline_latency"] == {"llm": 0.4, "vlm": 2.0}
+
+    limit._start_probe()
+    for latency in (0.7, 0.8, 0.9):
+        limit.observe(latency, True, saturated=False, in_flight=1, kind="llm")
+    # The device got slower for text chat; LLaVA was not probed and keeps its baseline
+    assert limit.stats()["baseline_latency"] == {"llm": 0.7, "vlm": 2.0}
+
+
+if __name__ == "__main__":
+    test_limit_backs_off_when_gpu_is_overloaded()
+    test_limit_grows_when_gpu_has_headroom()
+    test_limit_stays_within_bounds()
+    test_limit_does_not_grow_without_load()
+    test_probe_refreshes_the_baselines_it_measured()
+    print("✅ All adaptive concurrency tests passed!")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test that abandoned calls are cancelled across the model-server socket, and the GPU-time savings estimate
+"""
+
+import asyncio
+
+from ipc_fixtures import shm_segments, with_server
+from scheduling import CancellationStats
+
+
+class SlowService:
+    def __init__(self):
+        self.cancelled = []
+        self.finished = []
+
+    async def work(self, name: str, seconds: float):
+        try:
+            await asyncio.sleep(seconds)
+            self.finished.append(name)
+            return name
+        except asyncio.CancelledError:
+            self.cancelled.append(name)
+            raise
+
+    async def words(self, count: int):
+        try:
+            for i in range(count):
+                await asyncio.sleep(0.02)
+                yield {"word": i, "audio": b"x" * 100_000}  # Large enough to travel through shared memory
+            self.finished.append("words")
+        except asyncio.CancelledError:
+            self.cancelled.append("words")
+            raise
+
+
+SLOW_METHODS = {"work", "words"}
+
+
+def test_timed_out_call_is_cancelled_on_the_server():
+    service = SlowService()
+
+    async def scenario(client):
+        try:
+            await asyncio.wait_for(client.call("work", name="slow", seconds=5), timeout=0.2)
+        except asyncio.TimeoutError:
+            pass
+        await asyncio.sleep(0.1)
+        cancelled = list(service.cancelled)  # Before teardown cancels whatever is left
+        # The connection is still usable afterwards
+        fast = await client.call("work", name="fast", seconds=0)
+        return cancelled, service.finished, fast
+
+    cancelled, finished, fast = asyncio.run(with_server(service, SLOW_METHODS, scenario))
+    assert cancelled == ["slow"]
+    assert finished == ["fast"] and fast == "fast"
+
+
+def test_abandoned_stream_stops_the_server_generator():
+    before = shm_segments()
+    service = SlowService()
+
+    async def scenario(client):
+        stream = client.stream("words", count=50)
+        first = await stream.__anext__()
+        await stream.aclose()
+        await asyncio.sleep(0.2)
+        return list(service.cancelled), first
+
+    cancelled, first = asyncio.run(with_server(service, SLOW_METHODS, scenario))
+    assert first["word"] == 0 and len(first["audio"]) == 100_000
+    assert cancelled == ["words"]
+    assert shm_segments() <= before
+
+
+def test_savings_estimate_uses_typical_run_time():
+    stats = CancellationStats(gpu_kinds=("whisper",))
+    for seconds in (2.0, 2.0, 2.0):
+        stats.completed("whisper", seconds)
+    stats.dropped("whisper")  # Never started: a whole typical run saved
+    stats.aborted("whisper", 0.5)  # Stopped early: the rest of a typical run saved
+    stats.aborted("whisper", 3.0)  # Ran longer than usual: nothing to claim
+    stats.dropped("tts")  # Counted, but not GPU time
+
+    report = stats.stats()
+    assert report["gpu_seconds_saved"] == 2.0 + 1.5
+    assert report["kinds"]["whisper"]["dropped"] == 1
+    assert report["kinds"]["whisper"]["aborted"] == 2
+    assert report["kinds"]["tts"]["dropped"] == 1
+
+
+if __name__ == "__main__":
+    test_timed_out_call_is_cancelled_on_the_server()
+    test_abandoned_stream_stops_the_server_generator()
+    test_savings_estimate_uses_typical_run_time()
+    print("✅ All cancellation tests passed!")
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Test the model-server IPC: round trips, shared memory payloads, multiplexed calls and connection loss
+"""
+
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+
+from ipc import SHM_THRESHOLD, ModelServerError, RPCClient, RPCServer, SharedBlob
+from ipc_fixtures import shm_segments, socket_path, with_server
+
+
+class EchoService:
+    async def echo(self, value):
+        return value
+
+    async def size(self, data):
+        # Large arguments arrive as shared memory handles
+        return {"shared": isinstance(data, SharedBlob), "size": len(data.tobytes() if isinstance(data, SharedBlob) else data)}
+
+    async def blob(self, size: int):
+        return b"y" * size
+
+    async def sleep(self, name: str, seconds: float):
+        await asyncio.sleep(seconds)
+        return name
+
+    async def fail(self):
+        raise RuntimeError("model exploded")
+
+    async def invalid(self):
+        raise ValueError("costs must not be negative")
+
+
+ECHO_METHODS = {"echo", "size", "blob", "sleep", "fail", "invalid"}
+
+
+def test_round_trip():
+    async def scenario(client):
+        value = {"text": "selamat datang", "numbers": [1, 2.5, None], "nested": {"ok": True}, "audio": b"\x00\xff"}
+        return await client.call("echo", value=value)
+
+    assert asyncio.run(with_server(EchoService(), ECHO_METHODS, scenario)) == {
+        "text": "selamat datang", "numbers": [1, 2.5, None], "nested": {"ok": True}, "audio": b"\x00\xff"
+    }
+
+
+def test_large_payloads_use_shared_memory_and_are_unlinked():
+    before = shm_segments()
+
+    async def scenario(client):
+        sent = await client.call("size", data=b"x" * (SHM_THRESHOLD * 4))
+        received = await client.call("blob", size=SHM_THRESHOLD * 4)
+        return sent, received
+
+    sent, received = asyncio.run(with_server(EchoService(), ECHO_METHODS, scenario))
+    assert sent == {"shared": True, "size": SHM_THRESHOLD * 4}
+    assert received == b"y" * (SHM_THRESHOLD * 4)
+    assert shm_segments() <= before
+
+
+def test_concurrent_calls_are_multiplexed():
+    async def scenario(client):
+        order = []
+
+        async def call(name, seconds):
+            result = await client.call("sleep", name=name, seconds=seconds)
+            order.append(result)
+            return result
+
+        results = await asyncio.gather(call("slow", 0.3), call("medium", 0.15), call("fast", 0.0))
+        return results, order
+
+    results, order = asyncio.run(with_server(EchoService(), ECHO_METHODS, scenario))
+    # Each caller gets its own reply, and a slow call does not hold up the others
+    assert results == ["slow", "medium", "fast"]
+    assert order == ["fast", "medium", "slow"]
+
+
+def test_server_errors_are_raised_on_the_client():
+    async def scenario(client):
+        try:
+            await client.call("fail")
+        except ModelServerError as e:
+            return str(e)
+
+    assert asyncio.run(with_server(EchoService(), ECHO_METHODS, scenario)) == "model exploded"
+
+
+def test_invalid_arguments_stay_value_errors():
+    async def scenario(client):
+        try:
+            await client.call("invalid")
+        except ValueError as e:
+            return str(e)
+
+    assert asyncio.run(with_server(EchoService(), ECHO_METHODS, scenario)) == "costs must not be negative"
+
+
+def test_connection_loss_fails_pending_calls_and_reconnects():
+    async def scenario():
+        path = socket_path()
+        server = RPCServer(EchoService(), path, {"sleep", "echo"})
+        await server.start()
+        client = RPCClient(path)
+        await client.connect()
+        pending = asyncio.create_task(client.call("sleep", name="lost", seconds=5))
+        await asyncio.sleep(0.1)
+
+        # Model server goes away mid-call
+        await server.close()
+        client._writer.transport.abort()
+        try:
+            await asyncio.wait_for(pending, timeout=2)
+            lost = None
+        except ModelServerError as e:
+            lost = str(e)
+
+        # ...and comes back: the next call reconnects
+        server = RPCServer(EchoService(), path, {"sleep", "echo"})
+        await server.start()
+        try:
+            again = await client.call("echo", value="back")
+        finally:
+            await client.close()
+            await server.close()
+        return lost, again
+
+    lost, again = asyncio.run(scenario())
+    assert lost == "Model server connection lost"
+    assert again == "back"
+
+
+def serve_echo(path: str):
+    async def serve():
+        server = RPCServer(EchoService(), path, {"size", "blob"})
+        await server.start()
+        await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+def run_against_spawned_server():
+    """Large calls to a server in a spawned process, which shares this process's resource tracker"""
+    path = socket_path()
+    server = multiprocessing.get_context("spawn").Process(target=serve_echo, args=(path,), daemon=True)
+    server.start()
+
+    async def calls():
+        client = RPCClient(path)
+        while True:
+            try:
+                await client.connect()
+                break
+            except (FileNotFoundError, ConnectionError):
+                await asyncio.sleep(0.05)
+        for _ in range(3):
+            assert (await client.call("size", data=b"x" * SHM_THRESHOLD))["shared"]
+            assert len(await client.call("blob", size=SHM_THRESHOLD)) == SHM_THRESHOLD
+        await client.close()
+
+    try:
+        asyncio.run(calls())
+    finally:
+        server.terminate()
+        server.join()
+
+
+def test_shared_resource_tracker_stays_quiet():
+    before = shm_segments()
+    process = subprocess.run(
+        [sys.executable, "-c", "import test_ipc; test_ipc.run_against_spawned_server()"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, timeout=60
+    )
+    assert process.returncode == 0, process.stderr
+    # No KeyError tracebacks from double unregistration, no "leaked shared_memory" warnings
+    assert "Traceback" not in process.stderr and "leaked" not in process.stderr, process.stderr
+    assert shm_segments() <= before
+
+
+if __name__ == "__main__":
+    test_round_trip()
+    test_large_payloads_use_shared_memory_and_are_unlinked()
+    test_concurrent_calls_are_multiplexed()
+    test_server_errors_are_raised_on_the_client()
+    test_invalid_arguments_stay_value_errors()
+    test_connection_loss_fails_pending_calls_and_reconnects()
+    test_shared_resource_tracker_stays_quiet()
+    print("✅ All IPC tests passed!")
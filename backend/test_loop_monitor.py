@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Test that the loop lag monitor counts a blocking call and points at the line that blocked
+"""
+
+import asyncio
+import time
+
+from loop_monitor import LoopLagMonitor
+
+
+def block_the_loop(seconds: float):
+    time.sleep(seconds)  # The offender
+
+
+def test_blocking_call_is_counted_and_located():
+    async def scenario():
+        monitor = LoopLagMonitor(interval=0.01, block_threshold=0.1)
+        monitor.start()
+        try:
+            await asyncio.sleep(0.2)  # Some normal, unblocked ticks
+            block_the_loop(0.4)
+            await asyncio.sleep(0.1)  # Let the probe wake up late and record it
+            return monitor.stats()
+        finally:
+            monitor.stop()
+
+    stats = asyncio.run(scenario())
+    assert stats["blocked_count"] == 1
+    assert stats["samples"] > 5
+    # Most ticks are on time; the worst one is the blocked one
+    assert stats["lag_ms"]["p50"] < 50
+    assert 300 <= stats["lag_ms"]["max"] < 1000
+
+    [offender] = stats["top_offenders"]
+    assert offender["count"] == 1 and offender["max_seconds"] >= 0.3
+    assert offender["stack"][-1].endswith(f"test_loop_monitor.py:{block_the_loop.__code__.co_firstlineno + 1} "
+                                          f"in block_the_loop")
+
+
+def test_no_blocks_on_a_healthy_loop():
+    async def scenario():
+        monitor = LoopLagMonitor(interval=0.01, block_threshold=0.1)
+        monitor.start()
+        try:
+            await asyncio.sleep(0.3)
+            return monitor.stats()
+        finally:
+            monitor.stop()
+
+    stats = asyncio.run(scenario())
+    assert stats["blocked_count"] == 0 and stats["top_offenders"] == []
+
+
+if __name__ == "__main__":
+    test_blocking_call_is_counted_and_located()
+    test_no_blocks_on_a_healthy_loop()
+    print("✅ All loop monitor tests passed!")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test near-duplicate detection and video frame sampling on synthetic images and clips
+"""
+
+import io
+import os
+import tempfile
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from media import collect_distinct_images, dedupe_images, iter_video_frames
+
+FPS = 10
+SIZE = (96, 64)  # width, height
+
+
+def scene(seed: int) -> np.ndarray:
+    """A distinct picture: smooth random blobs, so the difference hash has structure to see"""
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 256, size=(6, 9, 3), dtype=np.uint8)
+    return cv2.resize(small, SIZE, interpolation=cv2.INTER_CUBIC)
+
+
+def jpeg(image: np.ndarray, quality: int = 90) -> bytes:
+    buffer = io.BytesIO()
+    Image.fromarray(image).save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def video(scenes, seconds_per_scene: float) -> bytes:
+    """MJPEG clip showing each scene in turn"""
+    path = os.path.join(tempfile.mkdtemp(), "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), FPS, SIZE)
+    for seed in scenes:
+        for _ in range(round(seconds_per_scene * FPS)):
+            writer.write(scene(seed))
+    writer.release()
+    with open(path, "rb") as f:
+        data = f.read()
+    os.unlink(path)
+    return data
+
+
+def test_dedupe_images_flags_near_identical():
+    images = [jpeg(scene(1)), jpeg(scene(2)), jpeg(scene(1), quality=60), jpeg(scene(3))]
+    assert dedupe_images(images, max_distance=6) == [None, None, 0, None]
+
+
+def test_frames_cover_the_whole_video():
+    clip = video([1, 2, 3, 4, 5], seconds_per_scene=2.0)
+    frames = list(iter_video_frames(clip, interval=0.5))
+    assert len(frames) == 20
+
+
+def test_static_video_is_sampled_to_the_end():
+    # 10 seconds, 20 samples at 0.5s, but only four different scenes; the last one starts at 9s
+    clip = video([1, 1, 1, 2, 2, 2, 3, 3, 3, 4], seconds_per_scene=1.0)
+    kept, duplicate_of, truncated = collect_distinct_images(
+        [], iter_video_frames(clip, interval=0.5), max_distance=6, max_unique=16, max_frames=600
+    )
+    unique = [index for index, original in enumerate(duplicate_of) if original is None]
+    assert len(duplicate_of) == 20
+    assert unique == [0, 6, 12, 18]
+    assert not truncated
+    # Only distinct frames keep their bytes
+    assert [image is not None for image in kept] == [original is None for original in duplicate_of]
+
+
+def test_uploaded_images_and_frames_are_deduplicated_together():
+    kept, duplicate_of, truncated = collect_distinct_images(
+        [jpeg(scene(7))], iter_video_frames(video([7, 8], seconds_per_scene=1.0), interval=0.5),
+        max_distance=6, max_unique=16, max_frames=600
+    )
+    assert duplicate_of == [None, 0, 0, None, 3]
+    assert not truncated
+
+
+def test_truncated_when_there_are_too_many_distinct_frames():
+    clip = video(range(10), seconds_per_scene=0.5)
+    kept, duplicate_of, truncated = collect_distinct_images(
+        [], iter_video_frames(clip, interval=0.5), max_distance=6, max_unique=4, max_frames=600
+    )
+    assert duplicate_of == [None] * 4
+    assert truncated
+
+
+def test_truncated_when_the_video_is_too_long():
+    clip = video([1], seconds_per_scene=5.0)
+    kept, duplicate_of, truncated = collect_distinct_images(
+        [], iter_video_frames(clip, interval=0.5), max_distance=6, max_unique=16, max_frames=4
+    )
+    assert duplicate_of == [None, 0, 0, 0]
+    assert truncated
+
+
+if __name__ == "__main__":
+    test_dedupe_images_flags_near_identical()
+    test_frames_cover_the_whole_video()
+    test_static_video_is_sampled_to_the_end()
+    test_uploaded_images_and_frames_are_deduplicated_together()
+    test_truncated_when_there_are_too_many_distinct_frames()
+    test_truncated_when_the_video_is_too_long()
+    print("✅ All media tests passed!")
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Test the Ollama host pool against local fake Ollama servers with different latency profiles
+"""
+
+import asyncio
+import base64
+import json
+import threading
+import time
+
+import ollama_pool
+from ollama_pool import OllamaHostError, OllamaPool
+
+
+class FakeOllama:
+    """Tiny HTTP server speaking just enough of the Ollama API"""
+
+    def __init__(self, name: str, models, loaded=(), latency=lambda n: 0.05, drop=lambda n: False):
+        self.name = name
+        self.models = list(models)
+        self.loaded = list(loaded)
+        self.latency = latency  # Seconds for the n-th chat request
+        self.drop = drop  # Close the connection without answering the n-th chat request
+        self.chats = 0
+        self.images = []  # Images of each chat request, as received
+        self.streamed_words = 0
+        self.server = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode()
+            method, path, _ = request_line.split(" ", 2)
+            length = 0
+            while True:
+                line = (await reader.readline()).decode().strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            body = json.loads(await reader.readexactly(length)) if length else {}
+
+            if path == "/api/tags":
+                payload = {"models": [{"name": model} for model in self.models]}
+            elif path == "/api/ps":
+                payload = {"models": [{"name": model} for model in self.loaded]}
+            elif path == "/api/chat" and method == "POST" and body.get("stream"):
+                self.chats += 1
+                self.images.append(body["messages"][0].get("images"))
+                await self._stream_reply(writer, body["model"])
+                return
+            elif path == "/api/chat" and method == "POST":
+                self.chats += 1
+                self.images.append(body["messages"][0].get("images"))
+                if self.drop(self.chats):
+                    return
+                await asyncio.sleep(self.latency(self.chats))
+                payload = {"model": body["model"], "message": {"role": "assistant", "content": self.name}}
+            else:
+                payload = {"error": "not found"}
+
+            data = json.dumps(payload).encode()
+            status = "404 Not Found" if "error" in payload else "200 OK"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode() + data
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+
+    async def _stream_reply(self, writer, model):
+        """NDJSON chunks, one word of the host name every `latency` seconds"""
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nConnection: close\r\n\r\n")
+        for word in self.name.split():
+            await asyncio.sleep(self.latency(self.chats))
+            chunk = {"model": model, "message": {"role": "assistant", "content": word + " "}, "done": False}
+            writer.write(json.dumps(chunk).encode() + b"\n")
+            await writer.drain()
+            self.streamed_words += 1
+        writer.write(json.dumps({"model": model, "message": {"content": ""}, "done": True}).encode() + b"\n")
+        await writer.drain()
+
+
+def chat_message(text="hello"):
+    return [{"role": "user", "content": text}]
+
+
+async def with_pool(servers, scenario, **pool_options):
+    for server in servers:
+        await server.start()
+    pool = OllamaPool([server.url for server in servers], health_interval=3600, **pool_options)
+    await pool.start()
+    try:
+        return await scenario(pool)
+    finally:
+        await pool.stop()
+        for server in servers:
+            await server.stop()
+
+
+def test_least_outstanding_spreads_load():
+    servers = [FakeOllama("a", ["llama3.2:1b"], latency=lambda n: 0.1),
+               FakeOllama("b", ["llama3.2:1b"], latency=lambda n: 0.1)]
+
+    async def scenario(pool):
+        replies = await asyncio.gather(*(pool.chat("llama3.2:1b", chat_message()) for _ in range(10)))
+        return [reply["message"]["content"] for reply in replies]
+
+    answered_by = asyncio.run(with_pool(servers, scenario))
+    assert answered_by.count("a") == 5
+    assert answered_by.count("b") == 5
+
+
+def test_routes_to_host_with_model():
+    servers = [FakeOllama("text", ["llama3.2:1b:latest"]),
+               FakeOllama("vision", ["llava:latest"])]
+
+    async def scenario(pool):
+        vision = await asyncio.gather(*(pool.chat("llava", chat_message()) for _ in range(4)))
+        text = await pool.chat("llama3.2:1b", chat_message())
+        return [reply["message"]["content"] for reply in vision], text["message"]["content"]
+
+    vision, text = asyncio.run(with_pool(servers, scenario))
+    assert vision == ["vision"] * 4
+    assert text == "text"
+
+
+def test_prefers_host_with_model_loaded():
+    servers = [FakeOllama("cold", ["llava:latest"]),
+               FakeOllama("warm", ["llava:latest"], loaded=["llava:latest"])]
+
+    async def scenario(pool):
+        return (await pool.chat("llava", chat_message()))["message"]["content"]
+
+    assert asyncio.run(with_pool(servers, scenario)) == "warm"
+
+
+def test_skips_unhealthy_host():
+    down = FakeOllama("down", ["llama3.2:1b"])
+    up = FakeOllama("up", ["llama3.2:1b"])
+
+    async def scenario(pool):
+        await down.stop()
+        await pool.check_all()
+        replies = await asyncio.gather(*(pool.chat("llama3.2:1b", chat_message()) for _ in range(3)))
+        return pool, [reply["message"]["content"] for reply in replies]
+
+    async def run():
+        await down.start()
+        await up.start()
+        pool = OllamaPool([down.url, up.url], health_interval=3600)
+        await pool.start()
+        try:
+            return await scenario(pool)
+        finally:
+            await pool.stop()
+            await up.stop()
+
+    pool, answered_by = asyncio.run(run())
+    assert answered_by == ["up"] * 3
+    assert not pool.hosts[0].healthy
+
+
+def test_single_host_survives_a_transient_connection_error():
+    server = FakeOllama("only", ["llama3.2:1b"], drop=lambda n: n == 1)
+
+    async def scenario(pool):
+        try:
+            await pool.chat("llama3.2:1b", chat_message())
+            first = None
+        except OllamaHostError as e:
+            first = str(e)
+        marked_down = not pool.hosts[0].healthy
+        # No health check in between: the host is still tried rather than every request failing
+        second = await pool.chat("llama3.2:1b", chat_message())
+        return first, marked_down, second["message"]["content"], pool.hosts[0].healthy
+
+    first, marked_down, second, healthy = asyncio.run(with_pool([server], scenario))
+    assert "unreachable" in first
+    assert marked_down
+    assert second == "only"
+    assert healthy
+
+
+def test_hedges_when_host_latency_spikes():
+    # "spiky" is fast for its first request, then stalls for two seconds
+    servers = [FakeOllama("spiky", ["llama3.2:1b"], loaded=["llama3.2:1b"], latency=lambda n: 0.05 if n == 1 else 2.0),
+               FakeOllama("steady", ["llama3.2:1b"], latency=lambda n: 0.1)]
+
+    async def scenario(pool):
+        # Warm up: one request to spiky establishes its normal latency
+        first = await pool.chat("llama3.2:1b", chat_message())
+        pool.hosts[1].outstanding = 1  # Keep the router on spiky for the next pick
+        start = time.monotonic()
+        second = await pool.chat("llama3.2:1b", chat_message(), hedge=True)
+        pool.hosts[1].outstanding = 0
+        return first["message"]["content"], second["message"]["content"], time.monotonic() - start, pool
+
+    first, second, elapsed, pool = asyncio.run(with_pool(servers, scenario, hedge_min_delay=0.1))
+    print(f"Hedged request answered by {second} in {elapsed:.2f}s")
+    assert first == "spiky"
+    assert second == "steady"
+    assert elapsed < 1.0
+    assert pool.hedged_requests == 1
+
+
+def test_hedge_delay_uses_the_latency_of_the_requested_model():
+    # "busy" answered one slow LLaVA request and one fast text chat, then stalls
+    servers = [FakeOllama("busy", ["llama3.2:1b", "llava"], latency=lambda n: {1: 0.6, 2: 0.05}.get(n, 2.0)),
+               FakeOllama("steady", ["llama3.2:1b", "llava"], latency=lambda n: 0.1)]
+
+    async def scenario(pool):
+        pool.hosts[1].outstanding = 1  # Keep the router on busy
+        await pool.chat("llava", chat_message())
+        await pool.chat("llama3.2:1b", chat_message())
+        start = time.monotonic()
+        reply = await pool.chat("llama3.2:1b", chat_message(), hedge=True)
+        pool.hosts[1].outstanding = 0
+        return reply["message"]["content"], time.monotonic() - start, pool.hosts[0].latency
+
+    answered_by, elapsed, latency = asyncio.run(with_pool(servers, scenario, hedge_min_delay=0.1))
+    assert set(latency) == {"llava", "llama3.2:1b"}
+    assert latency["llava"] > 0.5 > latency["llama3.2:1b"]
+    # Hedged after ~2x the text latency, not after LLaVA's pace mixed into one average
+    assert answered_by == "steady"
+    assert elapsed < 0.6
+
+
+def test_chat_stream_yields_as_generated_and_aborts_on_close():
+    server = FakeOllama("satu dua tiga empat lima enam tujuh lapan", ["llama3.2:1b"], latency=lambda n: 0.05)
+
+    async def scenario(pool):
+        start = time.monotonic()
+        arrivals = []
+        async for delta in pool.chat_stream("llama3.2:1b", chat_message()):
+            arrivals.append((delta, time.monotonic() - start))
+        full_reply = "".join(delta for delta, _ in arrivals)
+
+        # Stop reading after two words: the connection is closed and the server stops sending
+        stream = pool.chat_stream("llama3.2:1b", chat_message())
+        partial = [await stream.__anext__(), await stream.__anext__()]
+        await stream.aclose()
+        words_at_close = server.streamed_words
+        await asyncio.sleep(0.3)
+        return arrivals, full_reply, partial, words_at_close, pool
+
+    arrivals, full_reply, partial, words_at_close, pool = asyncio.run(with_pool([server], scenario))
+    assert full_reply == "satu dua tiga empat lima enam tujuh lapan "
+    assert arrivals[0][1] < arrivals[-1][1] / 2  # First word long before the last
+    assert partial == ["satu ", "dua "]
+    # The first stream sent all 8 words; the abandoned one stopped soon after the close
+    assert words_at_close == 8 + 2
+    assert server.streamed_words <= 8 + 3
+    assert pool.hosts[0].outstanding == 0
+
+
+def test_images_are_encoded_off_the_event_loop(monkeypatch):
+    server = FakeOllama("vision", ["llava:latest"])
+    encoded_on = []
+    encode_body = ollama_pool._encode_body
+
+    def recording_encode_body(*args):
+        encoded_on.append(threading.current_thread())
+        return encode_body(*args)
+
+    monkeypatch.setattr(ollama_pool, "_encode_body", recording_encode_body)
+    image = bytes(range(256)) * 100
+
+    async def scenario(pool):
+        await pool.chat("llava", [{"role": "user", "content": "describe", "images": [image]}])
+        async for _ in pool.chat_stream("llava", [{"role": "user", "content": "describe", "images": [image]}]):
+            pass
+        await pool.chat("llava", chat_message())
+
+    asyncio.run(with_pool([server], scenario))
+    assert server.images == [[base64.b64encode(image).decode()]] * 2 + [None]
+    # Image requests are built in a worker thread; a plain text chat is not worth the hop
+    assert [thread is threading.main_thread() for thread in encoded_on] == [False, False, True]
+
+
+if __name__ == "__main__":
+    test_least_outstanding_spreads_load()
+    test_routes_to_host_with_model()
+    test_prefers_host_with_model_loaded()
+    test_skips_unhealthy_host()
+    test_single_host_survives_a_transient_connection_error()
+    test_hedges_when_host_latency_spikes()
+    test_hedge_delay_uses_the_latency_of_the_requested_model()
+    test_chat_stream_yields_as_generated_and_aborts_on_close()
+    print("✅ All Ollama pool tests passed!")
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test that the GPU slot semaphore serves interactive work before bulk work and never leaks slots
+"""
+
+import asyncio
+
+from scheduling import PrioritySemaphore
+
+
+async def settle():
+    """Let every runnable task take its next step"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_interactive_work_jumps_ahead_of_queued_bulk_work():
+    async def scenario():
+        semaphore = PrioritySemaphore(1)
+        order = []
+
+        async def job(name, priority):
+            await semaphore.acquire(priority)
+            order.append(name)
+            await asyncio.sleep(0.01)
+            semaphore.release(priority)
+
+        await semaphore.acquire("bulk")
+        tasks = [asyncio.create_task(job(f"bulk-{i}", "bulk")) for i in range(3)]
+        await settle()
+        tasks += [asyncio.create_task(job(f"chat-{i}", "interactive")) for i in range(2)]
+        await settle()
+        semaphore.release("bulk")
+        await asyncio.gather(*tasks)
+        return order
+
+    # Interactive callers arrived last but are served first, each class in arrival order
+    assert asyncio.run(scenario()) == ["chat-0", "chat-1", "bulk-0", "bulk-1", "bulk-2"]
+
+
+def test_bulk_cap_is_enforced():
+    async def scenario():
+        semaphore = PrioritySemaphore(4, class_limits={"bulk": 2})
+        bulk = [asyncio.create_task(semaphore.acquire("bulk")) for _ in range(4)]
+        await settle()
+        held_by_bulk = semaphore.in_use_by_class["bulk"]
+
+        # Bulk is at its cap, so the free slots go to interactive work even though bulk queued first
+        interactive = [asyncio.create_task(semaphore.acquire("interactive")) for _ in range(2)]
+        await settle()
+        all_interactive_running = all(task.done() for task in interactive)
+
+        # A bulk slot coming back goes to the next bulk waiter, never past the cap
+        semaphore.release("bulk")
+        await settle()
+        return held_by_bulk, all_interactive_running, semaphore.stats(), sum(task.done() for task in bulk)
+
+    held_by_bulk, all_interactive_running, stats, bulk_started = asyncio.run(scenario())
+    assert held_by_bulk == 2
+    assert all_interactive_running
+    assert stats["in_use_by_class"] == {"interactive": 2, "bulk": 2} and stats["waiting"] == 1
+    assert bulk_started == 3
+
+
+def test_waiter_at_its_class_cap_does_not_block_others():
+    async def scenario():
+        semaphore = PrioritySemaphore(2, class_limits={"bulk": 1})
+        await semaphore.acquire("bulk")
+        await semaphore.acquire("interactive")
+        bulk = asyncio.create_task(semaphore.acquire("bulk"))
+        interactive = asyncio.create_task(semaphore.acquire("interactive"))
+        await settle()
+
+        # The freed slot skips the capped bulk waiter
+        semaphore.release("interactive")
+        await settle()
+        return bulk.done(), interactive.done()
+
+    assert asyncio.run(scenario()) == (False, True)
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    async def scenario():
+        semaphore = PrioritySemaphore(1)
+        await semaphore.acquire()
+        waiter = asyncio.create_task(semaphore.acquire())
+        await settle()
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        queued_after_cancel = semaphore.waiting
+
+        # Granted and cancelled in the same step: the slot must be given back
+        granted = asyncio.create_task(semaphore.acquire())
+        await settle()
+        semaphore.release()
+        granted.cancel()
+        await asyncio.gather(granted, return_exceptions=True)
+        return queued_after_cancel, granted.cancelled(), semaphore.stats()
+
+    queued_after_cancel, cancelled, stats = asyncio.run(scenario())
+    assert queued_after_cancel == 0
+    assert cancelled
+    assert stats["in_use"] == 0 and stats["waiting"] == 0
+
+
+def test_raising_the_limit_wakes_waiters():
+    async def scenario():
+        semaphore = PrioritySemaphore(1)
+        await semaphore.acquire()
+        waiters = [asyncio.create_task(semaphore.acquire()) for _ in range(3)]
+        await settle()
+        semaphore.set_limit(3)
+        await settle()
+        woken = sum(task.done() for task in waiters)
+
+        # Lowering it wakes nobody; slots drain as they are released
+        semaphore.set_limit(1)
+        semaphore.release()
+        await settle()
+        return woken, sum(task.done() for task in waiters), semaphore.stats()
+
+    woken, done_after_lowering, stats = asyncio.run(scenario())
+    assert woken == 2
+    assert done_after_lowering == 2
+    assert stats["in_use"] == 2 and stats["waiting"] == 1
+
+
+if __name__ == "__main__":
+    test_interactive_work_jumps_ahead_of_queued_bulk_work()
+    test_bulk_cap_is_enforced()
+    test_waiter_at_its_class_cap_does_not_block_others()
+    test_cancelled_waiter_does_not_leak_a_slot()
+    test_raising_the_limit_wakes_waiters()
+    print("✅ All priority semaphore tests passed!")
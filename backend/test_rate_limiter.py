@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test the per-session token buckets on a fake clock
+"""
+
+import pytest
+
+import rate_limiter
+from rate_limiter import RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock)
+    return clock
+
+
+def limiter(**kwargs):
+    return RateLimiter(**{"capacity": 10, "refill_rate": 1.0, "costs": {"llm": 1, "vlm": 4}, **kwargs})
+
+
+def test_burst_then_retry_after(clock):
+    limits = limiter()
+    assert all(limits.take("session:a", "llm") == 0 for _ in range(10))
+    # Empty bucket: one token comes back per second
+    assert limits.take("session:a", "llm") == pytest.approx(1.0)
+    assert limits.stats()["rejected"] == {"llm": 1}
+
+    clock.now += 1.0
+    assert limits.take("session:a", "llm") == 0
+
+
+def test_sessions_have_their_own_buckets(clock):
+    limits = limiter()
+    for _ in range(10):
+        limits.take("session:a", "llm")
+    assert limits.take("session:a", "llm") > 0
+    assert limits.take("session:b", "llm") == 0
+
+
+def test_cost_weights_endpoints(clock):
+    limits = limiter()
+    assert limits.take("session:a", "vlm") == 0  # 4 tokens
+    assert limits.take("session:a", "vlm") == 0  # 8 tokens
+    # 2 tokens left, a third VLM call needs 2 more
+    assert limits.take("session:a", "vlm") == pytest.approx(2.0)
+    assert limits.take("session:a", "llm") == 0
+
+
+def test_large_batch_runs_from_a_full_bucket_and_leaves_debt(clock):
+    limits = limiter()
+    # 25 prompts cost more than the whole bucket: admitted once it is full...
+    assert limits.take("session:a", "llm", units=25) == 0
+    # ...and the debt (15 tokens) must be repaid before the next request
+    assert limits.take("session:a", "llm") == pytest.approx(16.0)
+
+    clock.now += 16.0
+    assert limits.take("session:a", "llm") == 0
+
+
+def test_large_batch_waits_for_a_full_bucket(clock):
+    limits = limiter()
+    limits.take("session:a", "vlm")  # 6 tokens left
+    assert limits.take("session:a", "llm", units=25) == pytest.approx(4.0)
+
+    clock.now += 4.0
+    assert limits.take("session:a", "llm", units=25) == 0
+
+
+def test_refill_is_capped_at_capacity(clock):
+    limits = limiter()
+    limits.take("session:a", "llm")
+    clock.now += 3600
+    assert all(limits.take("session:a", "llm") == 0 for _ in range(10))
+    assert limits.take("session:a", "llm") > 0
+
+
+def test_configure(clock):
+    limits = limiter()
+    stats = limits.configure(capacity=5, costs={"vlm": 2})
+    assert stats["capacity"] == 5 and stats["costs"] == {"llm": 1, "vlm": 2}
+    assert all(limits.take("session:a", "llm") == 0 for _ in range(5))
+    assert limits.take("session:a", "llm") > 0
+
+    limits.configure(enabled=False)
+    assert limits.take("session:a", "llm") == 0
+
+
+@pytest.mark.parametrize("changes", [{"costs": {"llm": -1}}, {"capacity": 0}, {"refill_rate": -0.5}])
+def test_configure_rejects_invalid_values(changes):
+    limits = limiter()
+    with pytest.raises(ValueError):
+        limits.configure(**changes)
+    assert limits.stats()["costs"] == {"llm": 1, "vlm": 4}
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Test incremental sentence splitting of streamed LLM output
+"""
+
+from sentences import SentenceSplitter
+
+
+def feed_in_pieces(splitter, text, size=3):
+    sentences = []
+    for i in range(0, len(text), size):
+        sentences += splitter.feed(text[i:i + size])
+    return sentences
+
+
+def test_splits_sentences_as_they_complete():
+    splitter = SentenceSplitter()
+    assert splitter.feed("Kecerdasan buatan ialah bidang sains komputer") == []
+    assert splitter.feed(". Ia belajar") == ["Kecerdasan buatan ialah bidang sains komputer."]
+    assert splitter.feed(" daripada data!\n") == ["Ia belajar daripada data!"]
+    assert splitter.flush() is None
+
+
+def test_keeps_decimals_lists_and_short_fragments_together():
+    splitter = SentenceSplitter()
+    text = "Hi! Pi is about 3.14 in value. Steps:\n1. Collect the data\n2. Train"
+    assert feed_in_pieces(splitter, text) == [
+        "Hi! Pi is about 3.14 in value.",
+        "Steps:\n1. Collect the data",
+    ]
+    assert splitter.flush() == "2. Train"
+
+
+def test_breaks_overlong_runs_at_a_comma():
+    splitter = SentenceSplitter(max_chars=40)
+    sentences = feed_in_pieces(splitter, "robots, sensors and cameras, all working together without any pause at all")
+    assert sentences[0] == "robots, sensors and cameras,"
+    assert all(len(sentence) <= 40 for sentence in sentences)
+
+
+if __name__ == "__main__":
+    test_splits_sentences_as_they_complete()
+    test_keeps_decimals_lists_and_short_fragments_together()
+    test_breaks_overlong_runs_at_a_comma()
+    print("✅ All sentence splitter tests passed!")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test the stats ring buffers and the per-second to per-minute to per-hour roll-ups with a fake collector
+"""
+
+import math
+
+import pytest
+
+import stats_sampler
+from stats_sampler import RingBuffer, SystemStatsSampler
+
+
+class FakeCollector:
+    """cpu_percent counts samples; queue_depth is missing (NaN) on every third one"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        values = {"cpu_percent": float(self.calls)}
+        if self.calls % 3:
+            values["queue_depth"] = 1.0
+        return values
+
+
+@pytest.fixture
+def sampler(monkeypatch):
+    now = [1_700_000_000.0]
+
+    def tick():
+        now[0] += 1.0
+        return now[0]
+
+    monkeypatch.setattr(stats_sampler.time, "time", tick)
+    return SystemStatsSampler(FakeCollector(), interval=1.0)
+
+
+def test_ring_buffer_wraps_around_oldest_first():
+    buffer = RingBuffer(["a", "b"], capacity=4)
+    for i in range(6):
+        buffer.append(float(i), [i, 10 * i])
+
+    series = buffer.series()
+    assert series == {"timestamp": [2.0, 3.0, 4.0, 5.0], "a": [2.0, 3.0, 4.0, 5.0], "b": [20.0, 30.0, 40.0, 50.0]}
+    # limit keeps the newest points, still oldest first
+    assert buffer.series(limit=2)["a"] == [4.0, 5.0]
+    assert buffer.series(limit=10)["a"] == [2.0, 3.0, 4.0, 5.0]
+
+
+def test_ring_buffer_before_it_fills():
+    buffer = RingBuffer(["a"], capacity=4)
+    assert buffer.series() == {"timestamp": [], "a": []}
+    buffer.append(1.0, [math.nan])
+    buffer.append(2.0, [7.0])
+    assert buffer.series() == {"timestamp": [1.0, 2.0], "a": [None, 7.0]}
+
+
+def test_snapshot_is_the_latest_sample(sampler):
+    sampler.sample()
+    sampler.sample()
+    assert sampler.snapshot() == {"timestamp": 1_700_000_002.0, "cpu_percent": 2.0, "queue_depth": 1.0}
+
+
+def test_seconds_roll_up_into_minutes(sampler):
+    for _ in range(150):
+        sampler.sample()
+
+    seconds = sampler.history("1s", limit=3)["series"]
+    assert seconds["cpu_percent"] == [148.0, 149.0, 150.0]
+    assert seconds["queue_depth"] == [1.0, 1.0, None]
+
+    minutes = sampler.history("1m")["series"]
+    # Two full minutes (samples 1-60 and 61-120); the third is still being summed
+    assert minutes["cpu_percent"] == [30.5, 90.5]
+    assert minutes["timestamp"] == [1_700_000_060.0, 1_700_000_120.0]
+    assert sampler.history("1h")["series"]["cpu_percent"] == []
+
+
+def test_minutes_roll_up_into_hours(sampler):
+    for _ in range(2 * 3600):
+        sampler.sample()
+
+    hours = sampler.history("1h")["series"]
+    assert hours["cpu_percent"] == [1800.5, 5400.5]
+    assert hours["timestamp"] == [1_700_003_600.0, 1_700_007_200.0]
+    # The 1s buffer only keeps the last five minutes
+    assert len(sampler.history("1s")["series"]["cpu_percent"]) == 300
+    assert len(sampler.history("1m")["series"]["cpu_percent"]) == 120
+
+
+def test_history_rejects_unknown_resolution(sampler):
+    assert sampler.history("1m") == {"resolution": "1m", "series": {}}
+    with pytest.raises(ValueError):
+        sampler.history("1d")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test that a crashed child process is restarted, and that a crash loop gives up
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from supervisor import ProcessSupervisor
+
+
+def crash_once(marker: str):
+    """Exits with an error the first time, then stays up"""
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        sys.exit(3)
+    time.sleep(60)
+
+
+def crash_always():
+    sys.exit(3)
+
+
+def wait_for(condition, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+def test_crashed_child_is_restarted():
+    marker = os.path.join(tempfile.mkdtemp(), "crashed")
+    supervisor = ProcessSupervisor(crash_once, args=(marker,), name="model-server", max_restarts=3)
+    supervisor.start()
+    try:
+        wait_for(lambda: len(supervisor.restarts) == 1 and supervisor.process.is_alive())
+        assert not supervisor.gave_up
+    finally:
+        supervisor.stop()
+    assert not supervisor.process.is_alive()
+
+
+def test_crash_loop_gives_up():
+    gave_up = threading.Event()
+    supervisor = ProcessSupervisor(crash_always, name="model-server", max_restarts=2, on_give_up=gave_up.set)
+    supervisor.start()
+    try:
+        assert gave_up.wait(timeout=30)
+        assert supervisor.gave_up and len(supervisor.restarts) == 2
+    finally:
+        supervisor.stop()
+
+
+def test_stop_does_not_restart():
+    supervisor = ProcessSupervisor(time.sleep, args=(60,), name="model-server")
+    supervisor.start()
+    supervisor.stop()
+    time.sleep(0.2)
+    assert not supervisor.restarts and not supervisor.process.is_alive()
+
+
+if __name__ == "__main__":
+    test_crashed_child_is_restarted()
+    test_crash_loop_gives_up()
+    test_stop_does_not_restart()
+    print("✅ All supervisor tests passed!")
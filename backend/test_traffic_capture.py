@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test traffic capture on a tiny ASGI app and replay against a local HTTP server
+"""
+
+import asyncio
+import base64
+import glob
+import json
+import time
+
+from replay import build_request, load_capture, replay
+from traffic_capture import TrafficCapture
+
+
+async def echo_app(scope, receive, send):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok:" + body})
+
+
+async def call(app, path, body=b"", session=None, content_type="application/json"):
+    chunks = [{"type": "http.request", "body": body[:3], "more_body": True},
+              {"type": "http.request", "body": body[3:], "more_body": False}]
+    headers = [(b"content-type", content_type.encode())]
+    if session:
+        headers.append((b"x-session-id", session.encode()))
+    scope = {"type": "http", "method": "POST", "path": path, "query_string": b"", "headers": headers}
+
+    async def receive():
+        return chunks.pop(0)
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+def read_capture(directory, expected):
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline:
+        paths = glob.glob(f"{directory}/capture-*.jsonl")
+        records = load_capture(paths) if paths else []
+        if len(records) >= expected:
+            return records
+        time.sleep(0.01)
+    raise AssertionError(f"Expected {expected} captured requests")
+
+
+def test_capture_records_shapes_and_sampled_payloads(tmp_path):
+    hashed = TrafficCapture(echo_app, str(tmp_path / "hashed"), sample_rate=0.0)
+    sampled = TrafficCapture(echo_app, str(tmp_path / "sampled"), sample_rate=1.0)
+    body = json.dumps({"text": "Selamat datang", "user_name": "Ali"}).encode()
+
+    async def run():
+        await call(hashed, "/api/tts", body, session="kiosk-1")
+        await call(hashed, "/api/tts", body, session="kiosk-1")
+        await call(hashed, "/api/admin/capacity", body)
+        await call(sampled, "/api/tts", body)
+
+    asyncio.run(run())
+    first, second = read_capture(tmp_path / "hashed", 2)
+    assert first["path"] == "/api/tts" and first["status"] == 200
+    assert first["request_bytes"] == len(body)
+    assert first["response_bytes"] == len(body) + 3
+    assert "payload" not in first and "kiosk-1" not in json.dumps(first)
+    assert first["payload_hash"] == second["payload_hash"]
+    assert first["session"] == second["session"]
+
+    (kept,) = read_capture(tmp_path / "sampled", 1)
+    assert base64.b64decode(kept["payload"]) == body
+    assert build_request(kept)["content"] == body
+
+
+def multipart(boundary, audio):
+    return (f"--{boundary}\r\nContent-Disposition: form-data; name=\"audio\"; filename=\"recording.wav\"\r\n"
+            f"Content-Type: audio/wav\r\n\r\n").encode() + audio + f"\r\n--{boundary}--\r\n".encode()
+
+
+def test_same_upload_hashes_the_same_whatever_the_boundary(tmp_path):
+    capture = TrafficCapture(echo_app, str(tmp_path), sample_rate=0.0)
+    clip, other_clip = b"RIFF" + bytes(range(256)) * 8, b"RIFF" + bytes(255 - i for i in range(256)) * 8
+
+    async def run():
+        for boundary, audio in (("----WebKitFormBoundaryA1", clip), ("----WebKitFormBoundaryZ9", clip),
+                                ("----WebKitFormBoundaryQ5", other_clip)):
+            await call(capture, "/api/whisper", multipart(boundary, audio),
+                       content_type=f"multipart/form-data; boundary={boundary}")
+
+    asyncio.run(run())
+    first, second, third = read_capture(tmp_path, 3)
+    assert first["payload_hash"] == second["payload_hash"]
+    assert third["payload_hash"] != first["payload_hash"]
+
+
+def test_synthetic_payloads_keep_size_and_repetition():
+    record = {"method": "POST", "path": "/api/tts", "request_bytes": 120, "payload_hash": "abc", "t": 0}
+    repeat = build_request(record)["json"]["text"]
+    assert repeat == build_request(dict(record))["json"]["text"]
+    assert repeat != build_request({**record, "payload_hash": "def"})["json"]["text"]
+    assert abs(len(repeat) - 50) <= 1
+
+    audio = build_request({**record, "path": "/api/whisper", "request_bytes": 64_400})
+    assert audio["files"]["audio"][1][:4] == b"RIFF"
+    assert len(audio["files"]["audio"][1]) == 64_000
+
+
+def test_replay_compresses_time_and_reports_percentiles():
+    async def handle(reader, writer):
+        request = await reader.readuntil(b"\r\n\r\n")
+        length = next((int(line.split(b":")[1]) for line in request.split(b"\r\n")
+                       if line.lower().startswith(b"content-length")), 0)
+        await reader.readexactly(length)
+        await asyncio.sleep(0.02)
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nConnection: close\r\n\r\nok")
+        await writer.drain()
+        writer.close()
+
+    records = [{"t": 100 + i * 0.2, "method": "POST", "path": "/api/llm", "duration": 0.5,
+                "request_bytes": 80, "payload_hash": str(i)} for i in range(11)]
+
+    async def run():
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        host, port = server.sockets[0].getsockname()[:2]
+        try:
+            return await replay(records, f"http://{host}:{port}", speed=4)
+        finally:
+            server.close()
+
+    report = asyncio.run(run())
+    stats = report["endpoints"]["POST /api/llm"]
+    print(f"Replayed 2s of traffic in {report['elapsed']:.2f}s: {stats}")
+    assert 0.5 <= report["elapsed"] < 1.5
+    assert stats["count"] == stats["ok"] == 11
+    assert 0.02 <= stats["p50"] <= stats["p99"] < 0.5
+    assert stats["captured_p50"] == 0.5
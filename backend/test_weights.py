@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Test memory-mapped Whisper loading against whisper.load_model on a small randomly initialised checkpoint
+"""
+
+import os
+
+import torch
+import whisper
+from whisper.model import ModelDimensions, Whisper
+
+import weights
+
+DIMS = dict(n_mels=80, n_vocab=51865, n_audio_ctx=1500, n_audio_state=64, n_audio_head=2, n_audio_layer=2,
+            n_text_ctx=448, n_text_state=64, n_text_head=2, n_text_layer=2)
+
+
+def fake_checkpoint(directory, monkeypatch):
+    """An fp16 checkpoint in the official format, served by a patched whisper._download"""
+    torch.manual_seed(0)
+    model = Whisper(ModelDimensions(**DIMS))
+    torch.nn.init.normal_(model.decoder.positional_embedding, std=0.01)  # torch.empty() until a checkpoint fills it
+    path = os.path.join(directory, "toy.pt")
+    state_dict = {key: value.half() if value.is_floating_point() else value for key, value in model.state_dict().items()}
+    torch.save({"dims": DIMS, "model_state_dict": state_dict}, path)
+    monkeypatch.setitem(whisper._MODELS, "toy", "toy-url")
+    monkeypatch.setattr(whisper, "_download", lambda url, root, in_memory: path)
+    return path
+
+
+def test_mapped_model_matches_load_model(tmp_path, monkeypatch):
+    checkpoint = fake_checkpoint(str(tmp_path), monkeypatch)
+    reference = whisper.load_model(checkpoint, device="cpu")
+    mapped = weights.load_whisper_model("toy", "cpu", str(tmp_path))
+
+    mel = torch.randn(1, 80, 3000)
+    tokens = torch.tensor([[50258, 50259, 50359, 50363]])
+    with torch.no_grad():
+        assert torch.equal(reference(mel, tokens), mapped(mel, tokens))
+    assert all(parameter.dtype == torch.float32 for parameter in mapped.parameters())
+    assert torch.equal(reference.decoder.mask, mapped.decoder.mask)
+
+
+def test_checkpoint_is_converted_once(tmp_path, monkeypatch):
+    fake_checkpoint(str(tmp_path), monkeypatch)
+    path = weights.convert_checkpoint("toy", str(tmp_path))
+    converted_at = os.stat(path).st_mtime_ns
+
+    weights.load_whisper_model("toy", "cpu", str(tmp_path))
+    assert os.stat(path).st_mtime_ns == converted_at
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_checkpoint_paths_are_left_to_load_model(tmp_path, monkeypatch):
+    checkpoint = fake_checkpoint(str(tmp_path), monkeypatch)
+    assert weights.can_map("toy") == weights.mmap_supported()
+    assert not weights.can_map(checkpoint)
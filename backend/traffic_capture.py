@@ -0,0 +1,149 @@
+"""
+Opt-in traffic capture for load rehearsal (see replay.py).
+
+An ASGI middleware records the shape of every request - endpoint, arrival
+time, duration, status, body sizes and a hash of the payload - as one JSON
+line per request. Multipart uploads are hashed without their (random,
+per-request) boundary, so the same audio clip always hashes the same. A configurable fraction of requests also keeps the full
+payload so replays can use real prompts, images and audio. Lines are
+written by a background thread so capture never blocks the event loop.
+Each process writes its own capture-<pid>.jsonl file.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+EXCLUDED_PREFIXES = ("/api/admin",)
+
+
+def short_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def multipart_boundary(content_type: str) -> bytes:
+    """Delimiter line prefix of a multipart/form-data body, or b"" for other content types"""
+    media_type, *params = content_type.split(";")
+    if media_type.strip().lower() != "multipart/form-data":
+        return b""
+    for param in params:
+        name, _, value = param.strip().partition("=")
+        if name.lower() == "boundary" and value:
+            return b"--" + value.strip('"').encode("latin-1")
+    return b""
+
+
+class PayloadDigest:
+    """SHA-256 of a request body as it streams in, leaving out the multipart boundary if there is one"""
+
+    def __init__(self, boundary: bytes = b""):
+        self.hash = hashlib.sha256()
+        self.boundary = boundary
+        self.pending = b""  # Might be the start of a boundary split across chunks
+
+    def update(self, data: bytes):
+        if not self.boundary:
+            self.hash.update(data)
+            return
+        *pieces, rest = (self.pending + data).split(self.boundary)
+        for piece in pieces:
+            self.hash.update(piece)
+            self.hash.update(b"--boundary")
+        keep = len(self.boundary) - 1
+        self.hash.update(rest[:-keep])
+        self.pending = rest[-keep:]
+
+    def hexdigest(self) -> str:
+        self.hash.update(self.pending)
+        self.pending = b""
+        return self.hash.hexdigest()
+
+
+class CaptureWriter:
+    """Appends records to a JSON-lines file from a daemon thread"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.records: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        threading.Thread(target=self._run, name="traffic-capture", daemon=True).start()
+
+    def write(self, record: Dict[str, Any]):
+        self.records.put(record)
+
+    def _run(self):
+        with open(self.path, "a", buffering=64 * 1024) as f:
+            while True:
+                record = self.records.get()
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+                if self.records.empty():
+                    f.flush()
+
+
+class TrafficCapture:
+    def __init__(self, app, directory: str, sample_rate: float = 0.0):
+        self.app = app
+        self.sample_rate = sample_rate
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"capture-{os.getpid()}.jsonl")
+        self.writer = CaptureWriter(path)
+        logger.info(f"Capturing traffic to {path} (payload sample rate {sample_rate})")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(EXCLUDED_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        arrival = time.time()
+        started = time.perf_counter()
+        keep_payload = random.random() < self.sample_rate
+        headers = {key.decode().lower(): value.decode("latin-1") for key, value in scope["headers"]}
+        digest = PayloadDigest(multipart_boundary(headers.get("content-type", "")))
+        chunks: List[bytes] = []
+        state = {"request_bytes": 0, "response_bytes": 0, "status": 0}
+
+        async def capture_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                state["request_bytes"] += len(body)
+                digest.update(body)
+                if keep_payload:
+                    chunks.append(body)
+            return message
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                state["response_bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, capture_receive, capture_send)
+        finally:
+            record = {
+                "t": arrival,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": state["status"],
+                "duration": time.perf_counter() - started,
+                "request_bytes": state["request_bytes"],
+                "response_bytes": state["response_bytes"],
+                "payload_hash": digest.hexdigest()[:16] if state["request_bytes"] else None,
+                # Hashed so repeat visitors are recognisable without storing who they are
+                "session": short_hash(headers["x-session-id"].encode()) if "x-session-id" in headers else None,
+            }
+            if keep_payload:
+                record["content_type"] = headers.get("content-type")
+                record["query"] = scope.get("query_string", b"").decode("latin-1")
+                record["payload"] = base64.b64encode(b"".join(chunks)).decode()
+            self.writer.write(record)
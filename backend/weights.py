@@ -0,0 +1,88 @@
+"""
+Memory-mapped Whisper weights.
+
+whisper.load_model() unpickles the checkpoint into private memory and copies
+it into a freshly initialised model, on every start and in every process.
+Here the checkpoint is converted once into a float32 torch file (float32 is
+what load_model ends up with too), which torch.load(mmap=True) maps instead
+of reading. Parameters are assigned straight from the mapping, so a CPU
+model's weights live in the page cache: restarts skip deserialization and
+all processes on a node share one copy. On GPU the mapping only speeds up
+loading; the weights are still copied to the device.
+"""
+
+import inspect
+import logging
+import os
+import tempfile
+
+import torch
+import whisper
+from accelerate import init_empty_weights
+from whisper.model import ModelDimensions, Whisper
+
+logger = logging.getLogger(__name__)
+
+
+def mmap_supported() -> bool:
+    """torch.load(mmap=True) and load_state_dict(assign=True) need torch >= 2.1"""
+    return ("mmap" in inspect.signature(torch.load).parameters
+            and "assign" in inspect.signature(torch.nn.Module.load_state_dict).parameters)
+
+
+def can_map(name: str) -> bool:
+    """Only official checkpoints, named as in whisper.available_models(), are converted;
+    anything else (e.g. a checkpoint path) is left to whisper.load_model"""
+    return mmap_supported() and name in whisper._MODELS
+
+
+def converted_path(name: str, directory: str) -> str:
+    return os.path.join(directory, f"{name}.f32.mmap.pt")
+
+
+def convert_checkpoint(name: str, directory: str) -> str:
+    """Download (if needed) and convert an official Whisper checkpoint; returns the converted file"""
+    path = converted_path(name, directory)
+    if os.path.exists(path):
+        return path
+    if name not in whisper._MODELS:
+        raise ValueError(f"Unknown Whisper model {name}, expected one of {whisper.available_models()}")
+
+    os.makedirs(directory, exist_ok=True)
+    logger.info(f"Converting Whisper {name} checkpoint for memory-mapped loading...")
+    checkpoint_file = whisper._download(whisper._MODELS[name], directory, in_memory=False)
+    checkpoint = torch.load(checkpoint_file, map_location="cpu")
+    state_dict = {
+        key: (value.float() if value.is_floating_point() else value).contiguous()
+        for key, value in checkpoint["model_state_dict"].items()
+    }
+
+    # Write then rename, so a process starting meanwhile never maps a half-written file
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        torch.save({"dims": checkpoint["dims"], "model_state_dict": state_dict}, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    logger.info(f"Converted Whisper {name} checkpoint to {path}")
+    return path
+
+
+def load_whisper_model(name: str, device: str, directory: str) -> Whisper:
+    """Whisper model whose weights are mapped read-only from the converted checkpoint"""
+    path = convert_checkpoint(name, directory)
+    checkpoint = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+
+    # Parameters start on the meta device and are replaced by the mapped tensors,
+    # so nothing is allocated or randomly initialised first
+    with init_empty_weights():
+        model = Whisper(ModelDimensions(**checkpoint["dims"]))
+    model.load_state_dict(checkpoint["model_state_dict"], assign=True)
+    if any(parameter.is_meta for parameter in model.parameters()):
+        raise RuntimeError(f"Converted checkpoint {path} is missing weights")
+
+    if name in whisper._ALIGNMENT_HEADS:
+        model.set_alignment_heads(whisper._ALIGNMENT_HEADS[name])
+    return model.to(device)
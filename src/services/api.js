@@ -2,6 +2,38 @@
 // Use relative URL for API calls - this will work through Vite proxy
 const API_BASE_URL = '';
 
+// Random UUID v4. crypto.randomUUID() only exists in secure contexts (HTTPS or
+// localhost) and kiosks load the app over plain HTTP, so fall back to
+// crypto.getRandomValues(), or Math.random() where even that is missing
+const newSessionId = () => {
+  if (typeof crypto !== 'undefined' && crypto.randomUUID) {
+    return crypto.randomUUID();
+  }
+  const bytes = new Uint8Array(16);
+  if (typeof crypto !== 'undefined' && crypto.getRandomValues) {
+    crypto.getRandomValues(bytes);
+  } else {
+    for (let i = 0; i < bytes.length; i++) {
+      bytes[i] = Math.floor(Math.random() * 256);
+    }
+  }
+  bytes[6] = (bytes[6] & 0x0f) | 0x40; // version 4
+  bytes[8] = (bytes[8] & 0x3f) | 0x80; // RFC 4122 variant
+  const hex = Array.from(bytes, (byte) => byte.toString(16).padStart(2, '0')).join('');
+  return `${hex.slice(0, 8)}-${hex.slice(8, 12)}-${hex.slice(12, 16)}-${hex.slice(16, 20)}-${hex.slice(20)}`;
+};
+
+// One id per browser tab so the backend can rate limit each kiosk separately
+// (all kiosks share one public IP)
+const getSessionId = () => {
+  let sessionId = sessionStorage.getItem('sessionId');
+  if (!sessionId) {
+    sessionId = newSessionId();
+    sessionStorage.setItem('sessionId', sessionId);
+  }
+  return sessionId;
+};
+
 class APIService {
   constructor() {
     this.baseURL = API_BASE_URL;
@@ -12,6 +44,7 @@ class APIService {
     const config = {
       headers: {
         'Content-Type': 'application/json',
+        'X-Session-Id': getSessionId(),
         ...options.headers,
       },
       ...options,
@@ -60,7 +93,7 @@ class APIService {
     
     return this.request('/api/whisper', {
       method: 'POST',
-      headers: {}, // Remove Content-Type to let browser set it for FormData
+      headers: { 'X-Session-Id': getSessionId() }, // No Content-Type, let browser set it for FormData
       body: formData,
     });
   }
@@ -71,6 +104,7 @@ class APIService {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
+        'X-Session-Id': getSessionId(),
       },
       body: JSON.stringify({
         text,
@@ -101,6 +135,41 @@ class APIService {
   }
 
 
+  // Voice assistant: spoken question in, spoken answer streamed back sentence by sentence.
+  // onEvent receives each event ({type: 'transcript' | 'text' | 'audio' | 'error' | 'done', ...});
+  // 'audio' events carry one sentence as base64 MP3, in playback order.
+  async askByVoice(audioBlob, onEvent, { voice = 'default', language, profile } = {}) {
+    const formData = new FormData();
+    formData.append('audio', audioBlob, 'recording.wav');
+    formData.append('voice', voice);
+    if (language) formData.append('language', language);
+    if (profile) formData.append('profile', profile);
+
+    const response = await fetch(`${this.baseURL}/api/voice`, {
+      method: 'POST',
+      headers: { 'X-Session-Id': getSessionId() },
+      body: formData,
+    });
+
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+
+    // NDJSON: one event per line, delivered as soon as each line arrives
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = '';
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffered += decoder.decode(value, { stream: true });
+      const lines = buffered.split('\n');
+      buffered = lines.pop();
+      lines.filter((line) => line.trim()).forEach((line) => onEvent(JSON.parse(line)));
+    }
+    if (buffered.trim()) onEvent(JSON.parse(buffered));
+  }
+
   // Health check
   async healthCheck() {
     return this.request('/health');
@@ -123,6 +192,7 @@ export const {
   analyzeImage,
   transcribeAudio,
   synthesizeSpeech,
+  askByVoice,
   healthCheck,
   getModels,
 } = apiService;
\ No newline at end of file